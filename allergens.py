@@ -0,0 +1,181 @@
+# allergens.py
+# Аллергены: теги продуктов, битовые маски блюд и учеников, пересчёт при изменении рецептов и профилей
+from flask import has_app_context
+from sqlalchemy import bindparam, event, select, update
+from sqlalchemy.orm import Session
+from models import db, Meal, Product, Recipe, Student
+from catalog import get_catalog, KIND_MENU
+
+# Словарь тегов: (код, название, основы слов для разбора свободного текста).
+# Номер тега в списке — номер бита в маске, поэтому новые теги добавляются только в конец
+ALLERGENS = (
+    ('milk', 'Молоко', ('молок', 'молоч', 'лактоз', 'сливк', 'сливоч', 'творог', 'сметан', 'сыр')),
+    ('gluten', 'Глютен', ('глютен', 'пшениц', 'мук', 'макарон', 'хлеб')),
+    ('eggs', 'Яйца', ('яйц', 'яичн')),
+    ('nuts', 'Орехи', ('орех', 'миндал', 'фундук', 'кешью', 'фисташ')),
+    ('peanuts', 'Арахис', ('арахис',)),
+    ('fish', 'Рыба', ('рыб',)),
+    ('shellfish', 'Ракообразные и моллюски', ('креветк', 'краб', 'моллюск', 'кальмар', 'мидии')),
+    ('soy', 'Соя', ('соя', 'сои', 'соев')),
+    ('sesame', 'Кунжут', ('кунжут',)),
+    ('celery', 'Сельдерей', ('сельдере',)),
+    ('mustard', 'Горчица', ('горчиц',)),
+    ('sulphites', 'Сульфиты', ('сульфит',)),
+    ('meat', 'Мясо', ('мяс', 'фарш', 'куриц', 'говя', 'свин', 'котлет')),
+)
+BITS = {code: 1 << i for i, (code, _, _) in enumerate(ALLERGENS)}
+NAMES = {code: name for code, name, _ in ALLERGENS}
+
+# Предпочтения, которые исключают теги (вегетарианцу не подходит мясо)
+PREFERENCES = (
+    (('вегетариан', 'веган', 'vegetarian', 'vegan'), BITS['meat']),
+)
+
+
+def mask_from_tags(tags):
+    """Маска по кодам тегов ('milk', 'eggs', ...); неизвестные коды пропускаются."""
+    mask = 0
+    for tag in tags:
+        mask |= BITS.get(tag.strip().lower(), 0)
+    return mask
+
+
+def tags_from_mask(mask):
+    return [code for code, bit in BITS.items() if mask & bit]
+
+
+def names_from_mask(mask):
+    """Названия тегов маски для показа: ['Молоко', 'Яйца']."""
+    return [NAMES[code] for code in tags_from_mask(mask)]
+
+
+def parse_allergies(text):
+    """Маска по свободному тексту: коды тегов и русские названия в любой форме ('орехи, молоко')."""
+    text = (text or '').lower()
+    if not text:
+        return 0
+    mask = 0
+    for code, _, stems in ALLERGENS:
+        if code in text or any(stem in text for stem in stems):
+            mask |= BITS[code]
+    return mask
+
+
+def parse_preferences(text):
+    text = (text or '').lower()
+    return sum(bit for words, bit in PREFERENCES if any(word in text for word in words))
+
+
+def student_mask(allergies, preferences):
+    """Маска ученика: аллергии и ограничения из предпочтений."""
+    return parse_allergies(allergies) | parse_preferences(preferences)
+
+
+def conflicts(meal_mask, user_mask):
+    """Названия аллергенов блюда, которые ученику нельзя; пустой список — блюдо безопасно."""
+    return names_from_mask((meal_mask or 0) & (user_mask or 0))
+
+
+def safe_meals(meals, user_mask):
+    """Блюда без аллергенов ученика — побитовая проверка без JOIN рецептов."""
+    return [meal for meal in meals if not meal.allergen_mask & (user_mask or 0)]
+
+
+# --- Пересчёт масок ---
+
+def _meal_masks(session, meal_ids=None):
+    stmt = select(Recipe.meal_id, Product.allergens).join(Product, Product.id == Recipe.product_id)
+    if meal_ids is not None:
+        stmt = stmt.where(Recipe.meal_id.in_(meal_ids))
+    masks = {meal_id: 0 for meal_id in meal_ids or ()}
+    for meal_id, allergens in session.execute(stmt):
+        masks[meal_id] = masks.get(meal_id, 0) | (allergens or 0)
+    return masks
+
+
+def refresh_meals(meal_ids=None, session=None):
+    """Пересчитывает маски блюд по рецептам (meal_ids=None — все блюда). Коммит — за вызывающим."""
+    session = session or db.session
+    if meal_ids is None:
+        masks = {meal_id: 0 for meal_id in session.scalars(select(Meal.id))}
+        masks.update(_meal_masks(session))
+    else:
+        masks = _meal_masks(session, list(meal_ids))
+    if masks:
+        session.connection().execute(
+            update(Meal.__table__).where(Meal.__table__.c.id == bindparam('meal_id')).values(allergen_mask=bindparam('mask')),
+            [{'meal_id': meal_id, 'mask': mask} for meal_id, mask in masks.items()],
+        )
+    return len(masks)
+
+
+def refresh_meals_for_products(product_ids, session=None):
+    """Пересчитывает маски блюд, в рецептах которых есть эти продукты."""
+    session = session or db.session
+    meal_ids = set(session.scalars(select(Recipe.meal_id).where(Recipe.product_id.in_(list(product_ids)))))
+    return refresh_meals(meal_ids, session) if meal_ids else 0
+
+
+def refresh_students():
+    """Пересчитывает маски всех учеников по тексту аллергий и предпочтений (после загрузки в обход ORM)."""
+    rows = db.session.execute(select(Student.id, Student.allergies, Student.preferences)).all()
+    params = [{'student_id': row.id, 'mask': student_mask(row.allergies, row.preferences)} for row in rows]
+    if params:
+        table = Student.__table__
+        db.session.execute(update(table).where(table.c.id == bindparam('student_id')).values(allergen_mask=bindparam('mask')), params)
+    return len(params)
+
+
+def refresh_all():
+    """Полный пересчёт индекса аллергенов: блюда и ученики."""
+    meals = refresh_meals()
+    students = refresh_students()
+    db.session.commit()
+    if has_app_context():
+        get_catalog().invalidate(KIND_MENU)
+    return {'meals': meals, 'students': students}
+
+
+# --- Инкрементальное обновление по событиям сессии ---
+
+@event.listens_for(Session, 'before_flush')
+def _collect_allergen_changes(session, flush_context, instances):
+    meal_ids = session.info.setdefault('allergen_meals', set())
+    product_ids = session.info.setdefault('allergen_products', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Student) and obj not in session.deleted:
+            # Маска ученика — производное от текста профиля, считаем её в том же UPDATE
+            mask = student_mask(obj.allergies, obj.preferences)
+            if obj.allergen_mask != mask:
+                obj.allergen_mask = mask
+        elif isinstance(obj, Recipe):
+            history = db.inspect(obj).attrs.meal_id.history
+            meal_ids.update(meal_id for meal_id in (obj.meal_id, *history.deleted) if meal_id is not None)
+        elif isinstance(obj, Product) and obj in session.dirty and db.inspect(obj).attrs.allergens.history.has_changes():
+            product_ids.add(obj.id)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _refresh_after_flush(session, flush_context):
+    meal_ids = session.info.pop('allergen_meals', set())
+    product_ids = session.info.pop('allergen_products', set())
+    if not meal_ids and not product_ids:
+        return
+    if product_ids:
+        meal_ids |= set(session.scalars(select(Recipe.meal_id).where(Recipe.product_id.in_(list(product_ids)))))
+    if meal_ids:
+        refresh_meals(meal_ids, session)
+        session.info['allergen_refreshed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_menu(session):
+    # Маски блюд пересчитаны UPDATE'ом мимо ORM — снимки меню в кэше устарели
+    if session.info.pop('allergen_refreshed', None) and has_app_context():
+        get_catalog().invalidate(KIND_MENU)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_allergen_changes(session):
+    for key in ('allergen_meals', 'allergen_products', 'allergen_refreshed'):
+        session.info.pop(key, None)
@@ -0,0 +1,91 @@
+# archive.py
+# Горячие и холодные данные: старые отметки питания, оплаты и отзывы переносятся в архив (отдельный файл SQLite)
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from flask import current_app
+from sqlalchemy import func, insert, select, delete, union_all
+from sqlalchemy.orm import aliased
+from models import db, MealTaken, Payment, Feedback, RollupCursor, meal_taken_archive, payment_archive, feedback_archive
+from rollups import catch_up
+
+# Источник -> (модель, архивная таблица, колонка даты, курсоры, которые должны пройти строку до переноса).
+# Отметки питания читают и агрегаты, и списание продуктов по рецептам (stock.apply_consumption)
+SOURCES = {
+    'meal_taken': (MealTaken, meal_taken_archive, MealTaken.taken_date, ('meal_taken', 'stock')),
+    'payment': (Payment, payment_archive, Payment.payment_date, ('payment',)),
+    'feedback': (Feedback, feedback_archive, Feedback.created_at, ('feedback',)),
+}
+ARCHIVES = {model: table for model, table, _, _ in SOURCES.values()}
+
+
+def _bound(model, cursors):
+    # Переносим только строки, которые уже учтены в daily_stat (курсор агрегатов) и, если
+    # списание по рецептам включено, уже списаны. Самую новую строку оставляем всегда:
+    # SQLite выдаёт новый id как max(id) + 1, и пустая таблица начала бы нумерацию заново
+    last_ids = dict(db.session.execute(
+        select(RollupCursor.source, RollupCursor.last_id).where(RollupCursor.source.in_(cursors))
+    ).all())
+    if cursors[0] not in last_ids:
+        return 0
+    max_id = db.session.scalar(select(func.max(model.id))) or 0
+    return min(*last_ids.values(), max_id - 1)
+
+
+def archive_old(days=None, batch_size=None):
+    """Переносит строки старше days дней (ARCHIVE_AFTER_DAYS) в архив; возвращает {источник: перенесено строк}.
+
+    Сначала догоняет агрегаты, чтобы отчёты по daily_stat не изменились. Перенос
+    идёт пакетами по id: INSERT ... SELECT в архив и коммит, затем DELETE из
+    оперативной таблицы и коммит. Если процесс упадёт между ними, строки временно
+    окажутся в обеих таблицах; следующий запуск (INSERT OR IGNORE) их удалит.
+    """
+    days = days if days is not None else current_app.config['ARCHIVE_AFTER_DAYS']
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    catch_up()
+    horizon = datetime.utcnow().date() - timedelta(days=days)
+    moved = {}
+    for source, (model, archive, column, cursors) in SOURCES.items():
+        hot = model.__table__
+        # Колонки Date SQLite хранит как 'YYYY-MM-DD' — сравниваем с датой, а не с datetime
+        cutoff = horizon if column.type.python_type is date else datetime.combine(horizon, datetime.min.time())
+        old = (hot.c[column.key] < cutoff, hot.c.id <= _bound(model, cursors))
+        moved[source] = 0
+        last_id = 0
+        while True:
+            ids = select(hot.c.id).where(*old, hot.c.id > last_id).order_by(hot.c.id).limit(batch_size).subquery()
+            first, last = db.session.execute(select(func.min(ids.c.id), func.max(ids.c.id))).one()
+            if first is None:
+                break
+            window = (*old, hot.c.id.between(first, last))
+            db.session.execute(insert(archive).prefix_with('OR IGNORE').from_select(
+                [c.name for c in hot.columns], select(*hot.columns).where(*window)
+            ))
+            db.session.commit()
+            moved[source] += db.session.execute(delete(hot).where(*window)).rowcount
+            db.session.commit()
+            last_id = last
+    return moved
+
+
+@lru_cache(maxsize=None)
+def with_archive(model):
+    """ORM-сущность модели поверх UNION ALL оперативной таблицы и архива — для чтения истории.
+
+    Используется как сама модель: query(entity).filter(entity.student_id == ...).
+    SQLite переносит условия внутрь обеих частей UNION, поэтому запросы идут по
+    индексам каждой таблицы. Объекты — обычные экземпляры модели, только для чтения.
+    """
+    hot = model.__table__
+    union = union_all(select(*hot.columns), select(*ARCHIVES[model].columns)).subquery(f'{hot.name}_all')
+    return aliased(model, union)
+
+
+def stats():
+    """Число строк в оперативных таблицах и в архиве."""
+    result = {}
+    for source, (model, archive, _, _) in SOURCES.items():
+        result[source] = {
+            'hot': db.session.scalar(select(func.count()).select_from(model.__table__)),
+            'archive': db.session.scalar(select(func.count()).select_from(archive)),
+        }
+    return result
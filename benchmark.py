@@ -0,0 +1,230 @@
+# benchmark.py
+# Нагрузочный прогон основных сценариев через тестовый клиент Flask:
+#   python benchmark.py                         — сгенерировать данные во временной БД и прогнать сценарии
+#   python benchmark.py --save-baseline         — сохранить результат как эталон
+#   python benchmark.py --check                 — сравнить с эталоном, код выхода 1 при регрессии
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from app import create_app
+from datagen import generate
+from models import db, User, Meal
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+
+def percentile(values, pct):
+    """Перцентиль методом ближайшего ранга; values должны быть отсортированы."""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[rank]
+
+
+def summarize(durations, errors):
+    durations = sorted(durations)
+    total = sum(durations)
+    return {
+        'count': len(durations),
+        'errors': errors,
+        'rps': round(len(durations) / total, 1) if total else 0.0,
+        'mean_ms': round(total / len(durations) * 1000, 2) if durations else 0.0,
+        'p50_ms': round(percentile(durations, 50) * 1000, 2),
+        'p95_ms': round(percentile(durations, 95) * 1000, 2),
+        'p99_ms': round(percentile(durations, 99) * 1000, 2),
+    }
+
+
+def as_user(client, user_id):
+    # Вход через сессию Flask-Login, чтобы хэширование пароля не попадало в замер сценария
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+
+class Workload:
+    """Сценарии нагрузки. Каждый сценарий — функция (номер итерации) -> ответ."""
+
+    def __init__(self, app, password):
+        self.app = app
+        self.password = password
+        with app.app_context():
+            self.students = [row.id for row in User.query.filter_by(role='student').order_by(User.id).with_entities(User.id)]
+            self.usernames = [row.username for row in User.query.filter_by(role='student').order_by(User.id).limit(100).with_entities(User.username)]
+            self.cook_id = User.query.filter_by(role='cook').with_entities(User.id).first().id
+            self.admin_id = User.query.filter_by(role='admin').with_entities(User.id).first().id
+            self.meals = [row.id for row in db.session.query(Meal.id).order_by(Meal.id)]
+        if not self.students or not self.meals:
+            raise SystemExit('В базе нет учеников или блюд: сгенерируйте данные (без --db или с --generate).')
+        # Ученики для отметок: из начала списка — сами, из конца — через повара, чтобы не пересекаться
+        self._self_marks = iter(self.students)
+        self._cook_marks = iter(reversed(self.students))
+        self.client = app.test_client()
+
+    def scenarios(self):
+        return {
+            'login': self.login,
+            'menu': self.menu,
+            'mark_taken': self.mark_taken,
+            'track_meals': self.track_meals,
+            'manage_orders': self.manage_orders,
+            'reports': self.reports,
+        }
+
+    def login(self, i):
+        client = self.app.test_client()
+        return client.post('/login', data={'username': self.usernames[i % len(self.usernames)], 'password': self.password})
+
+    def menu(self, i):
+        as_user(self.client, self.students[i % len(self.students)])
+        return self.client.get('/menu')
+
+    def mark_taken(self, i):
+        as_user(self.client, next(self._self_marks, self.students[0]))
+        return self.client.post('/student/mark_taken', data={'meal_id': self.meals[i % len(self.meals)]})
+
+    def track_meals(self, i):
+        as_user(self.client, self.cook_id)
+        if i % 2:
+            return self.client.get('/cook/track_meals')
+        student_id = next(self._cook_marks, self.students[-1])
+        return self.client.post('/cook/track_meals', data={'student_id': student_id, 'meal_id': self.meals[i % len(self.meals)]})
+
+    def manage_orders(self, i):
+        as_user(self.client, self.admin_id)
+        return self.client.get('/admin/manage_orders', query_string={'status': 'pending'} if i % 2 else None)
+
+    def reports(self, i):
+        as_user(self.client, self.admin_id)
+        return self.client.get('/admin/reports')
+
+
+def run(workload, iterations, warmup, only=None):
+    results = {}
+    for name, scenario in workload.scenarios().items():
+        if only and name not in only:
+            continue
+        count = iterations[name] if isinstance(iterations, dict) else iterations
+        # Первые вызовы прогревают кэши (справочники, журнал выдачи, агрегаты) и в статистику не идут
+        for i in range(warmup):
+            scenario(i)
+        durations, errors = [], 0
+        for i in range(warmup, warmup + count):
+            start = time.perf_counter()
+            response = scenario(i)
+            durations.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+        results[name] = summarize(durations, errors)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Сравнение с эталоном: регрессия, если p95 вырос или пропускная способность упала больше чем на tolerance."""
+    rows, regressions = [], []
+    for name, current in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        p95_change = (current['p95_ms'] - base['p95_ms']) / base['p95_ms'] if base['p95_ms'] else 0.0
+        rps_change = (current['rps'] - base['rps']) / base['rps'] if base['rps'] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        rows.append((name, base['p95_ms'], current['p95_ms'], p95_change, base['rps'], current['rps'], rps_change, regressed))
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_results(results):
+    print(f'{"сценарий":<15}{"запросов":>9}{"ошибок":>8}{"req/s":>9}{"mean":>9}{"p50":>9}{"p95":>9}{"p99":>9}')
+    for name, r in results.items():
+        print(f'{name:<15}{r["count"]:>9}{r["errors"]:>8}{r["rps"]:>9}{r["mean_ms"]:>9}{r["p50_ms"]:>9}{r["p95_ms"]:>9}{r["p99_ms"]:>9}')
+
+
+def print_comparison(rows):
+    print(f'\n{"сценарий":<15}{"p95 было":>10}{"стало":>9}{"Δ":>8}{"req/s было":>12}{"стало":>9}{"Δ":>8}')
+    for name, base_p95, p95, p95_change, base_rps, rps, rps_change, regressed in rows:
+        mark = '  РЕГРЕССИЯ' if regressed else ''
+        print(f'{name:<15}{base_p95:>10}{p95:>9}{p95_change:>+8.0%}{base_rps:>12}{rps:>9}{rps_change:>+8.0%}{mark}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарк сценариев столовой на синтетических данных.')
+    parser.add_argument('--db', help='файл SQLite; без него данные генерируются во временной БД')
+    parser.add_argument('--generate', action='store_true', help='сгенерировать данные и в файле --db')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--password', default='password', help='пароль синтетических пользователей')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--login-iterations', type=int, default=20, help='вход дорогой из-за хэширования пароля')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help='прогнать только эти сценарии')
+    parser.add_argument('--output', help='записать результат в JSON-файл')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='сохранить результат как эталон')
+    parser.add_argument('--check', action='store_true', help='код выхода 1 при регрессии относительно эталона')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='допустимое ухудшение, доля (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if args.db:
+        db_path = os.path.abspath(args.db)
+    else:
+        tmpdir = tempfile.TemporaryDirectory(prefix='canteen-bench-')
+        db_path = os.path.join(tmpdir.name, 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}', 'JOBS_ENABLED': False})
+
+    with app.app_context():
+        db.create_all()
+        if tmpdir or args.generate:
+            start = time.perf_counter()
+            counts = generate(students=args.students, days=args.days, seed=args.seed, password=args.password)
+            print(f'Данные сгенерированы за {time.perf_counter() - start:.1f} с: '
+                  + ', '.join(f'{k}={v}' for k, v in counts.items()))
+
+    workload = Workload(app, args.password)
+    iterations = {name: args.iterations for name in workload.scenarios()}
+    iterations['login'] = args.login_iterations
+    results = run(workload, iterations, args.warmup, args.only)
+    print_results(results)
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'students': len(workload.students),
+        'days': args.days,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    status = 0
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'\nЭталон сохранён в {args.baseline}')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.tolerance)
+        print_comparison(rows)
+        if regressions and args.check:
+            status = 1
+
+    with app.app_context():
+        db.engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# benchmark_startup.py
+# Время холодного старта: каждый замер — новый процесс Python, как у команды CLI или воркера WSGI-сервера
+#   python benchmark_startup.py                 — медианы по сценариям
+#   python benchmark_startup.py --check         — код выхода 1, если медиана превышает бюджет
+#   python benchmark_startup.py --importtime    — самые дорогие модули при импорте (python -X importtime)
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Сценарий -> (код, бюджет по умолчанию в мс). Бюджеты — с запасом для медленной машины CI
+SCENARIOS = {
+    # Скрипт или команда canteen: фабрика без представлений и фоновых служб
+    'cli': ("from app import create_app\ncreate_app(web=False)", 1000),
+    # Воркер WSGI-сервера: то же, что wsgi.py
+    'worker': ("from app import create_app\ncreate_app()", 1200),
+    # Воркер до ответа на первый запрос: шаблон, сессия, запрос к БД
+    'first_request': ("from app import create_app\n"
+                      "create_app().test_client().get('/login')", 1400),
+}
+
+
+def measure(code, runs, env):
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=HERE, env=env, check=True, stdout=subprocess.DEVNULL)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def importtime(code, env, top):
+    """Модули с наибольшим собственным временем импорта."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=HERE, env=env,
+                            check=True, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, total, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        rows.append((int(own), int(total), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Время холодного старта приложения столовой.')
+    parser.add_argument('--runs', type=int, default=5, help='запусков на сценарий (берётся медиана)')
+    parser.add_argument('--only', nargs='*', choices=sorted(SCENARIOS), help='только эти сценарии')
+    parser.add_argument('--budget', action='append', default=[], metavar='СЦЕНАРИЙ=МС', help='свой бюджет сценария')
+    parser.add_argument('--check', action='store_true', help='код выхода 1, если медиана больше бюджета')
+    parser.add_argument('--importtime', type=int, nargs='?', const=15, metavar='N',
+                        help='показать N самых дорогих модулей сценария cli')
+    args = parser.parse_args(argv)
+
+    budgets = {name: budget for name, (_, budget) in SCENARIOS.items()}
+    for item in args.budget:
+        name, value = item.split('=', 1)
+        budgets[name] = float(value)
+
+    # Временная БД: замер не зависит от данных и не трогает рабочую базу; фоновые задачи не нужны
+    tmpdir = tempfile.TemporaryDirectory(prefix='canteen-startup-')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmpdir.name, 'startup.db')}", JOBS_ENABLED='0')
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'cli', 'canteen', 'init-db'], cwd=HERE, env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+
+    status = 0
+    print(f'{"сценарий":<15}{"медиана, мс":>13}{"мин":>9}{"макс":>9}{"бюджет":>9}')
+    for name, (code, _) in SCENARIOS.items():
+        if args.only and name not in args.only:
+            continue
+        durations = measure(code, args.runs, env)
+        median = statistics.median(durations) * 1000
+        over = median > budgets[name]
+        mark = '  ПРЕВЫШЕН' if over else ''
+        print(f'{name:<15}{median:>13.0f}{min(durations) * 1000:>9.0f}{max(durations) * 1000:>9.0f}{budgets[name]:>9.0f}{mark}')
+        if over and args.check:
+            status = 1
+
+    if args.importtime:
+        print(f'\n{"модуль":<45}{"своё, мс":>10}{"всего, мс":>11}')
+        for own, total, name in importtime(SCENARIOS['cli'][0], env, args.importtime):
+            print(f'{name.strip():<45}{own / 1000:>10.1f}{total / 1000:>11.1f}')
+
+    tmpdir.cleanup()
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# catalog.py
+# Кэш справочных данных: меню, список блюд и список продуктов
+import threading
+import time
+from collections import namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+from models import Meal, MealType, Product
+
+# Неизменяемые снимки строк: их можно безопасно отдавать в шаблоны из любого запроса,
+# в отличие от ORM-объектов, привязанных к сессии
+MealTypeView = namedtuple('MealTypeView', 'id name')
+MealView = namedtuple('MealView', 'id name description price meal_type_id meal_type allergen_mask')
+ProductView = namedtuple('ProductView', 'id name unit current_stock')
+
+# Какие модели влияют на какой раздел кэша
+KIND_MENU = 'menu'
+KIND_PRODUCTS = 'products'
+MODEL_KINDS = {Meal: KIND_MENU, MealType: KIND_MENU, Product: KIND_PRODUCTS}
+
+
+class CatalogCache:
+    """Read-through кэш справочников с явной инвалидацией и TTL.
+
+    Каждый раздел (меню, продукты) имеет номер версии, который увеличивается
+    после коммита, изменившего соответствующие строки. Запись в кэше хранит
+    версию, при которой её начали загружать, поэтому данные, прочитанные
+    одновременно с коммитом, при следующем обращении будут перечитаны.
+    TTL страхует от изменений, сделанных другими процессами.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.versions = {KIND_MENU: 0, KIND_PRODUCTS: 0}
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, kind, loader):
+        with self._lock:
+            version = self.versions[kind]
+            entry = self._entries.get(key)
+            if entry and entry[0] == version and time.monotonic() - entry[1] < self.ttl:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        value = loader()
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), value)
+        return value
+
+    def invalidate(self, *kinds):
+        with self._lock:
+            for kind in kinds or self.versions:
+                self.versions[kind] += 1
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'versions': dict(self.versions), 'entries': len(self._entries)}
+
+
+def get_catalog():
+    """Кэш справочников текущего приложения (создаётся при первом обращении)."""
+    catalog = current_app.extensions.get('catalog_cache')
+    if catalog is None:
+        catalog = CatalogCache(current_app.config.get('CATALOG_CACHE_TTL', 300))
+        current_app.extensions['catalog_cache'] = catalog
+    return catalog
+
+
+def _meal_view(meal):
+    meal_type = MealTypeView(meal.meal_type.id, meal.meal_type.name)
+    return MealView(meal.id, meal.name, meal.description, meal.price, meal.meal_type_id, meal_type, meal.allergen_mask)
+
+
+def _load_meals():
+    meals = Meal.query.options(joinedload(Meal.meal_type)).order_by(Meal.meal_type_id, Meal.id).all()
+    return [_meal_view(meal) for meal in meals]
+
+
+def _load_products():
+    return [ProductView(p.id, p.name, p.unit, p.current_stock) for p in Product.query.order_by(Product.id).all()]
+
+
+def get_meals():
+    """Все блюда (с типом приёма пищи)."""
+    return get_catalog().get('meals', KIND_MENU, _load_meals)
+
+
+def get_menu():
+    """Меню, сгруппированное по названию типа приёма пищи: {'Завтрак': [...], 'Обед': [...]}."""
+    def load():
+        menu = {}
+        for meal in get_meals():
+            menu.setdefault(meal.meal_type.name, []).append(meal)
+        return menu
+    return get_catalog().get('menu', KIND_MENU, load)
+
+
+def get_products():
+    """Все продукты с текущими остатками."""
+    return get_catalog().get('products', KIND_PRODUCTS, _load_products)
+
+
+# --- Инвалидация по событиям сессии ---
+
+@event.listens_for(Session, 'after_flush')
+def _collect_catalog_changes(session, flush_context):
+    kinds = session.info.setdefault('catalog_changes', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        kind = MODEL_KINDS.get(type(obj))
+        if kind:
+            kinds.add(kind)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    kinds = session.info.pop('catalog_changes', None)
+    if kinds and has_app_context():
+        get_catalog().invalidate(*kinds)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_changes(session):
+    session.info.pop('catalog_changes', None)
@@ -0,0 +1,175 @@
+# cli.py
+# Команды обслуживания: flask --app cli canteen <команда>
+# --app cli собирает приложение без представлений и фоновых служб; с --app app те же команды
+# работают в полном веб-приложении (как flask routes и flask shell).
+# Модули команд импортируются внутри функций: запуск одной команды не загружает зависимости остальных
+import csv
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app import create_app as create_web_app
+from models import db
+
+canteen_cli = AppGroup('canteen', help='Обслуживание базы данных столовой.')
+
+
+def create_app():
+    """Фабрика для flask --app cli: только модели и соединение с БД."""
+    return create_web_app(web=False)
+
+
+@canteen_cli.command('init-db')
+def init_db_command():
+    """Создать недостающие таблицы и индексы."""
+    from seed import init_db
+    init_db()
+    click.echo('Таблицы созданы.')
+
+
+@canteen_cli.command('seed')
+def seed_command():
+    """Создать таблицы и добавить тестовые данные."""
+    from seed import init_db, seed_demo_data
+    init_db()
+    seed_demo_data()
+    click.echo('Тестовые данные добавлены.')
+
+
+@canteen_cli.command('generate')
+@click.option('--students', default=5000, show_default=True, help='Сколько учеников создать.')
+@click.option('--days', default=365, show_default=True, help='За сколько дней создать историю.')
+@click.option('--seed', default=42, show_default=True, help='Зерно генератора случайных чисел.')
+@click.option('--password', default='password', show_default=True, help='Пароль синтетических пользователей.')
+def generate_command(students, days, seed, password):
+    """Заполнить базу синтетическими данными для нагрузочных тестов."""
+    from datagen import generate
+    from seed import init_db
+    init_db()
+    counts = generate(students=students, days=days, seed=seed, password=password)
+    click.echo(', '.join(f'{name}={count}' for name, count in counts.items()))
+
+
+@canteen_cli.command('create-user')
+@click.argument('username')
+@click.option('--role', type=click.Choice(('student', 'cook', 'admin')), default='student', show_default=True)
+@click.password_option(help='Пароль (без опции будет запрошен).')
+def create_user_command(username, role, password):
+    """Создать пользователя: ученика, повара или администратора."""
+    from models import User
+    from seed import create_users
+    if db.session.query(User.id).filter_by(username=username).first():
+        raise click.ClickException(f'Логин {username} уже занят.')
+    create_users([(username, password)], role)
+    click.echo(f'Пользователь {username} ({role}) создан.')
+
+
+def _import(import_fn, path, errors_path, chunk_size, **kwargs):
+    # Отчёт об ошибках пишется построчно, файл импорта читается пакетами
+    errors_file = open(errors_path, 'w', newline='', encoding='utf-8') if errors_path else None
+    writer = csv.writer(errors_file) if errors_file else None
+    if writer:
+        writer.writerow(['line', 'key', 'error'])
+
+    def on_error(line, key, message):
+        if writer:
+            writer.writerow([line, key, message])
+        else:
+            click.echo(f'строка {line}: {key} — {message}', err=True)
+
+    try:
+        with open(path, newline='', encoding='utf-8-sig') as stream:
+            result = import_fn(stream, on_error=on_error, chunk_size=chunk_size, **kwargs)
+    finally:
+        if errors_file:
+            errors_file.close()
+    click.echo(', '.join(f'{name}={count}' for name, count in result.as_dict().items()))
+
+
+@canteen_cli.command('import-students')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False), help='Записать ошибки по строкам в CSV.')
+@click.option('--chunk-size', type=int, help='Строк в одной транзакции (по умолчанию IMPORT_CHUNK_SIZE).')
+def import_students_command(path, errors_path, chunk_size):
+    """Загрузить учеников из CSV: username,password,allergies,preferences."""
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    from importer import import_students
+    from passwords import hash_many
+    # Пароли хэшируются на всех ядрах, пул процессов общий для всех пакетов
+    with ProcessPoolExecutor() as executor:
+        _import(import_students, path, errors_path, chunk_size, hasher=partial(hash_many, executor=executor))
+
+
+@canteen_cli.command('import-products')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False), help='Записать ошибки по строкам в CSV.')
+@click.option('--chunk-size', type=int, help='Строк в одной транзакции (по умолчанию IMPORT_CHUNK_SIZE).')
+def import_products_command(path, errors_path, chunk_size):
+    """Загрузить каталог продуктов из CSV: name,unit,current_stock."""
+    from importer import import_products
+    _import(import_products, path, errors_path, chunk_size)
+
+
+# Наборы и форматы совпадают с exporter.DATASETS и FORMATS; exporter импортируется только при выгрузке
+@canteen_cli.command('export')
+@click.argument('dataset', type=click.Choice(('payments', 'meals', 'orders')))
+@click.option('--format', 'fmt', type=click.Choice(('csv', 'jsonl')), default='csv', show_default=True)
+@click.option('--from', 'date_from', help='Начало периода, YYYY-MM-DD.')
+@click.option('--to', 'date_to', help='Конец периода включительно, YYYY-MM-DD.')
+@click.option('--gzip', 'compress', is_flag=True, help='Сжать gzip (включается сам для файла *.gz).')
+@click.option('--output', '-o', default='-', help='Файл выгрузки (по умолчанию stdout).')
+def export_command(dataset, fmt, date_from, date_to, compress, output):
+    """Выгрузить оплаты (payments), историю питания (meals) или заявки (orders)."""
+    from exporter import stream_export
+    compress = compress or output.endswith('.gz')
+    with click.open_file(output, 'wb') as out:
+        for chunk in stream_export(db.engine, dataset, fmt, date_from, date_to, compress):
+            out.write(chunk)
+
+
+@canteen_cli.command('refresh-allergens')
+def refresh_allergens_command():
+    """Пересчитать маски аллергенов блюд и учеников (после правок БД в обход приложения)."""
+    from allergens import refresh_all
+    counts = refresh_all()
+    click.echo(', '.join(f'{name}={count}' for name, count in counts.items()))
+
+
+@canteen_cli.command('archive')
+@click.option('--days', type=int, help='Переносить строки старше стольких дней (по умолчанию ARCHIVE_AFTER_DAYS).')
+def archive_command(days):
+    """Перенести старые отметки питания, оплаты и отзывы в архив (агрегаты отчётов сохраняются)."""
+    from archive import archive_old, stats as archive_stats
+    moved = archive_old(days)
+    for source, counts in archive_stats().items():
+        click.echo(f"{source}: перенесено {moved[source]}, в работе {counts['hot']}, в архиве {counts['archive']}")
+
+
+@canteen_cli.command('enqueue')
+@click.argument('name')
+def enqueue_command(name):
+    """Поставить фоновую задачу в очередь (выполнит веб-процесс или run-jobs)."""
+    from jobs import enqueue_job, REGISTRY
+    if name not in REGISTRY:
+        raise click.BadParameter(f'известные задачи: {", ".join(sorted(REGISTRY))}', param_hint='NAME')
+    entry = enqueue_job(name)
+    db.session.commit()
+    click.echo(f'#{entry.id} {name}')
+
+
+@canteen_cli.command('run-jobs')
+def run_jobs_command():
+    """Выполнить задачи из очереди и по расписанию в этом процессе и выйти (для cron без веб-сервера)."""
+    from jobs import JobRunner, sync_schedule
+    app = current_app._get_current_object()
+    runner = JobRunner(app, workers=app.config['JOBS_WORKERS'], retry_delay=app.config['JOBS_RETRY_DELAY'],
+                       stale_after=app.config['JOBS_STALE_AFTER'])
+    runner.worker_id = 'cli'
+    sync_schedule(app.config['JOBS_SCHEDULE'])
+    total = 0
+    while True:
+        started = runner.tick()
+        if not started:
+            break
+        total += started
+    click.echo(f'Выполнено задач: {total}')
@@ -0,0 +1,89 @@
+# config.py
+# Настройки приложения. Любое значение можно переопределить переменной окружения
+# с тем же именем (DATABASE_URL — для SQLALCHEMY_DATABASE_URI)
+import json
+import os
+
+
+def _env(name, default, cast=str):
+    value = os.environ.get(name)
+    return default if value is None else cast(value)
+
+
+def _flag(value):
+    return value.lower() in ('1', 'true', 'yes')
+
+
+class Config:
+    SECRET_KEY = _env('SECRET_KEY', 'your_secret_key_here') # Сменить на что-то сложное!
+    SQLALCHEMY_DATABASE_URI = _env('DATABASE_URL', 'sqlite:///canteen.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Пул соединений (не применяется к SQLite в памяти)
+    DB_POOL_SIZE = _env('DB_POOL_SIZE', 5, int)
+    DB_MAX_OVERFLOW = _env('DB_MAX_OVERFLOW', 10, int)
+    DB_POOL_TIMEOUT = _env('DB_POOL_TIMEOUT', 30, int) # Сколько (сек.) ждать свободное соединение
+    DB_POOL_RECYCLE = _env('DB_POOL_RECYCLE', 3600, int) # Через сколько (сек.) переоткрывать соединение
+
+    # PRAGMA, выполняемые на каждом новом соединении SQLite
+    SQLITE_JOURNAL_MODE = _env('SQLITE_JOURNAL_MODE', 'WAL') # Читатели не блокируют писателя
+    SQLITE_SYNCHRONOUS = _env('SQLITE_SYNCHRONOUS', 'NORMAL') # В режиме WAL безопасно и без fsync на каждый коммит
+    SQLITE_BUSY_TIMEOUT = _env('SQLITE_BUSY_TIMEOUT', 5000, int) # Сколько (мс) ждать блокировку вместо "database is locked"
+    SQLITE_CACHE_SIZE = _env('SQLITE_CACHE_SIZE', -20000, int) # Отрицательное значение — в КиБ (около 20 МБ)
+
+    SERVING_LEDGER_REFRESH = _env('SERVING_LEDGER_REFRESH', 60, int) # Как часто (сек.) журнал выдачи перечитывает meal_taken
+    QUERY_BUDGET_STRICT = _env('QUERY_BUDGET_STRICT', False, _flag) # True в тестах: превышение бюджета запросов — ошибка
+    USER_CACHE_TTL = _env('USER_CACHE_TTL', 30, int) # Сколько (сек.) load_user берёт пользователя из кэша без запроса к БД
+    USER_CACHE_SIZE = _env('USER_CACHE_SIZE', 1024, int) # Сколько пользователей держать в кэше (LRU)
+    CATALOG_CACHE_TTL = _env('CATALOG_CACHE_TTL', 300, int) # Сколько (сек.) живёт кэш меню и продуктов, если его не сбросили раньше
+    PAGE_SIZE = _env('PAGE_SIZE', 50, int) # Записей на странице в списках заявок и отзывов
+    STOCK_FORECAST_WINDOW = _env('STOCK_FORECAST_WINDOW', 14, int) # За сколько последних дней считать средний расход продуктов
+    STOCK_TARGET_DAYS = _env('STOCK_TARGET_DAYS', 7, int) # На сколько дней расхода рассчитывать рекомендуемый заказ
+
+    # Отложенная запись оплат, отзывов и отметок питания (см. write_behind.py)
+    WRITE_BEHIND_ENABLED = _env('WRITE_BEHIND_ENABLED', False, _flag)
+    WRITE_BEHIND_QUEUE_SIZE = _env('WRITE_BEHIND_QUEUE_SIZE', 10000, int) # Больше — запросы ждут место в очереди
+    WRITE_BEHIND_BATCH_SIZE = _env('WRITE_BEHIND_BATCH_SIZE', 500, int) # Записей в одной транзакции
+    WRITE_BEHIND_FLUSH_INTERVAL = _env('WRITE_BEHIND_FLUSH_INTERVAL', 0.05, float) # Сколько (сек.) добирать пакет
+    WRITE_BEHIND_ENQUEUE_TIMEOUT = _env('WRITE_BEHIND_ENQUEUE_TIMEOUT', 0.5, float) # Сколько (сек.) ждать места, затем запись синхронно
+
+    # Хэширование паролей (см. passwords.py): метод werkzeug и его стоимость по ролям.
+    # При входе хэш со старыми параметрами пересчитывается автоматически
+    PASSWORD_HASH_STUDENT = _env('PASSWORD_HASH_STUDENT', 'pbkdf2:sha256:100000') # Дешевле: сотни входов в начале смены
+    PASSWORD_HASH_COOK = _env('PASSWORD_HASH_COOK', 'scrypt:32768:8:1')
+    PASSWORD_HASH_ADMIN = _env('PASSWORD_HASH_ADMIN', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = _env('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2), int) # Сколько ядер могут занять KDF одновременно
+    PASSWORD_HASH_TIMEOUT = _env('PASSWORD_HASH_TIMEOUT', 10.0, float) # Сколько (сек.) вход ждёт пул, затем "сервер занят"
+    PASSWORD_VERIFY_CACHE_TTL = _env('PASSWORD_VERIFY_CACHE_TTL', 600, int) # Сколько (сек.) повторный вход с тем же паролем не запускает KDF (0 — выкл.)
+    PASSWORD_VERIFY_CACHE_SIZE = _env('PASSWORD_VERIFY_CACHE_SIZE', 4096, int)
+
+    # Фоновые задачи (см. jobs.py и /admin/jobs): пул потоков в каждом процессе, состояние — в таблице job
+    JOBS_ENABLED = _env('JOBS_ENABLED', True, _flag)
+    JOBS_WORKERS = _env('JOBS_WORKERS', 2, int) # Сколько задач процесс выполняет одновременно
+    JOBS_POLL_INTERVAL = _env('JOBS_POLL_INTERVAL', 5.0, float) # Как часто (сек.) проверять расписание и очередь
+    JOBS_MAX_ATTEMPTS = _env('JOBS_MAX_ATTEMPTS', 3, int)
+    JOBS_RETRY_DELAY = _env('JOBS_RETRY_DELAY', 30, int) # Задержка (сек.) перед первым повтором, дальше удваивается
+    JOBS_STALE_AFTER = _env('JOBS_STALE_AFTER', 1800, int) # Через сколько (сек.) 'running' считается прерванной (процесс упал)
+    JOBS_RETENTION_DAYS = _env('JOBS_RETENTION_DAYS', 7, int) # Сколько дней хранить завершённые задачи
+    # Расписание в формате cron (время UTC); переопределяется JSON-объектом в переменной окружения
+    JOBS_SCHEDULE = _env('JOBS_SCHEDULE', {
+        'catch_up': '*/5 * * * *',
+        'apply_consumption': '*/15 * * * *',
+        'cleanup_jobs': '30 3 * * *',
+        'archive': '0 4 * * *',
+    }, json.loads)
+
+    # Архив (см. archive.py): старые отметки питания, оплаты и отзывы переносятся в отдельный файл SQLite
+    ARCHIVE_DATABASE = _env('ARCHIVE_DATABASE', '') # Пусто — <основная БД>_archive.db рядом с ней
+    ARCHIVE_AFTER_DAYS = _env('ARCHIVE_AFTER_DAYS', 180, int) # Строки старше стольких дней уходят в архив
+    ARCHIVE_BATCH_SIZE = _env('ARCHIVE_BATCH_SIZE', 10000, int) # Строк в одной транзакции переноса
+
+    IMPORT_CHUNK_SIZE = _env('IMPORT_CHUNK_SIZE', 1000, int) # Строк CSV в одной транзакции импорта
+    IMPORT_ERROR_PREVIEW = _env('IMPORT_ERROR_PREVIEW', 100, int) # Сколько ошибок импорта показывать в админке
+
+    # Метрики производительности (см. instrumentation.py и /admin/stats)
+    PERF_ENABLED = _env('PERF_ENABLED', True, _flag)
+    PERF_SLOW_QUERY_MS = _env('PERF_SLOW_QUERY_MS', 100, float) # Запросы дольше этого (мс) попадают в образцы медленных
+    PERF_SLOW_QUERY_SAMPLES = _env('PERF_SLOW_QUERY_SAMPLES', 50, int) # Сколько последних медленных запросов хранить
+    PERF_PROFILE_RATE = _env('PERF_PROFILE_RATE', 0.0, float) # Доля запросов под cProfile (0 — профилировщик выключен)
+    PERF_PROFILE_KEEP = _env('PERF_PROFILE_KEEP', 10, int) # Сколько последних профилей хранить
@@ -1,15 +1,17 @@
-from app import app
-from models import db, Admin
+import sys
+from app import create_app
+from seed import create_users
 
-# Активируем контекст приложения
-app.app_context().push()
 
-# Создаём админа
-admin = Admin(username='cook', role='cook')
-admin.set_password('cook')
+def main(accounts):
+    # web=False — без представлений и фоновых служб: скрипту нужны только модели и соединение с БД.
+    # То же самое без отдельного скрипта: flask --app cli canteen create-user ЛОГИН --role cook
+    with create_app(web=False).app_context():
+        # Хэши считаем параллельно на всех ядрах, метод — из PASSWORD_HASH_COOK
+        count = create_users(accounts, 'cook')
+    print(f"Поваров создано: {count}")
 
-# Сохраняем в БД
-db.session.add(admin)
-db.session.commit()
 
-print("Админ создан!")
\ No newline at end of file
+# python create_cooker.py [логин:пароль ...] — без аргументов создаётся один повар
+if __name__ == '__main__':
+    main([arg.split(':', 1) for arg in sys.argv[1:]] or [('cook', 'cook')])
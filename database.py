@@ -0,0 +1,60 @@
+# database.py
+# Настройка движка БД: пул соединений, PRAGMA и файл архива для SQLite
+import os
+from sqlalchemy import event
+from models import db, ARCHIVE_SCHEMA
+
+
+def _is_memory_sqlite(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def engine_options(config):
+    """Параметры create_engine из настроек DB_POOL_*."""
+    if _is_memory_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        # Flask-SQLAlchemy сам выбирает StaticPool, параметры пула к нему неприменимы
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+    }
+
+
+def archive_path(app, engine):
+    """Файл архива: ARCHIVE_DATABASE (относительный путь — от instance_path) или <основная БД>_archive.db."""
+    database = engine.url.database or ''
+    if _is_memory_sqlite(str(engine.url)) or not database:
+        return ':memory:'
+    path = app.config['ARCHIVE_DATABASE']
+    if not path:
+        return os.path.splitext(database)[0] + '_archive.db'
+    return path if os.path.isabs(path) else os.path.join(app.instance_path, path)
+
+
+def init_sqlite(app):
+    """Включает WAL, busy_timeout, synchronous и размер кэша на каждом соединении SQLite и подключает архив."""
+    pragmas = [
+        f"PRAGMA journal_mode={app.config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT'])}",
+        f"PRAGMA cache_size={int(app.config['SQLITE_CACHE_SIZE'])}",
+    ]
+
+    def listener(path):
+        def on_connect(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            # Архив подключается до PRAGMA, чтобы journal_mode применился и к нему.
+            # ATTACH дешёвый: страницы архива читаются, только когда запрос обращается к схеме archive
+            cursor.execute(f'ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}', (path,))
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+        return on_connect
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', listener(archive_path(app, engine)))
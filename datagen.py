@@ -0,0 +1,129 @@
+# datagen.py
+# Генератор синтетических данных столовой для нагрузочных тестов и бенчмарков
+import random
+from datetime import datetime, timedelta
+from models import db, User, Student, Cook, Admin, Meal, MealType, MealTaken, Payment, Feedback, Product, Recipe, PurchaseOrder, OrderItem, RollupCursor
+from allergens import parse_allergies, refresh_meals, student_mask
+from passwords import hash_many
+
+CHUNK_SIZE = 10000
+
+MEAL_NAMES = {
+    'Завтрак': ['Каша овсяная', 'Каша рисовая', 'Омлет', 'Сырники', 'Блины', 'Запеканка'],
+    'Обед': ['Борщ', 'Щи', 'Суп куриный', 'Греча с котлеткой', 'Плов', 'Макароны по-флотски'],
+}
+PRODUCT_NAMES = [
+    ('Молоко', 'л'), ('Овсянка', 'кг'), ('Рис', 'кг'), ('Гречка', 'кг'), ('Мясо фарш', 'кг'), ('Курица', 'кг'),
+    ('Картофель', 'кг'), ('Капуста', 'кг'), ('Свёкла', 'кг'), ('Морковь', 'кг'), ('Лук', 'кг'), ('Яйца', 'шт'),
+    ('Мука', 'кг'), ('Творог', 'кг'), ('Сметана', 'кг'), ('Масло сливочное', 'кг'), ('Сахар', 'кг'), ('Макароны', 'кг'),
+]
+
+
+def _insert(table, rows):
+    """Пакетная вставка через executemany, кусками по CHUNK_SIZE строк."""
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(table.insert(), rows[start:start + CHUNK_SIZE])
+
+
+def _next_id(model):
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+def _create_users(model, role, prefix, count, password_hash, extra=None):
+    # Joined-table наследование: строка в user и строка в таблице роли с тем же id
+    first_id = _next_id(User)
+    ids = list(range(first_id, first_id + count))
+    _insert(User.__table__, [
+        {'id': user_id, 'username': f'{prefix}{user_id:06d}', 'password_hash': password_hash, 'role': role} for user_id in ids
+    ])
+    _insert(model.__table__, [dict({'id': user_id}, **(extra(user_id) if extra else {})) for user_id in ids])
+    return ids
+
+
+def generate(students=5000, days=365, cooks=5, admins=2, seed=42, password='password', participation=0.7, end_date=None):
+    """Заполняет БД реалистичным объёмом данных: пользователи, меню, склад и история за days дней.
+
+    История заканчивается вчерашним днём (end_date), чтобы сегодняшние отметки
+    оставались свободными для бенчмарка. Пароль у всех синтетических пользователей
+    один, хэш считается один раз на роль. Возвращает число созданных строк по таблицам.
+    """
+    rnd = random.Random(seed)
+    end_date = end_date or datetime.utcnow().date() - timedelta(days=1)
+    student_hash, cook_hash, admin_hash = hash_many([(password, 'student'), (password, 'cook'), (password, 'admin')])
+
+    # Справочники
+    meal_ids = []
+    for type_name, names in MEAL_NAMES.items():
+        meal_type = MealType.query.filter_by(name=type_name).first()
+        if meal_type is None:
+            meal_type = MealType(name=type_name)
+            db.session.add(meal_type)
+            db.session.flush()
+        for name in names:
+            meal = Meal(name=f'{name} №{_next_id(Meal)}', description='Синтетическое блюдо', price=float(rnd.randrange(60, 160, 5)), meal_type_id=meal_type.id)
+            db.session.add(meal)
+            db.session.flush()
+            meal_ids.append(meal.id)
+    product_ids = []
+    for name, unit in PRODUCT_NAMES:
+        product = Product(name=name, unit=unit, current_stock=float(rnd.randrange(50, 500)), allergens=parse_allergies(name))
+        db.session.add(product)
+        db.session.flush()
+        product_ids.append(product.id)
+    _insert(Recipe.__table__, [
+        {'meal_id': meal_id, 'product_id': product_id, 'quantity_needed': round(rnd.uniform(0.01, 0.3), 3)}
+        for meal_id in meal_ids for product_id in rnd.sample(product_ids, rnd.randint(3, 5))
+    ])
+    refresh_meals(meal_ids)
+
+    # Пользователи
+    allergens = ['орехи', 'молоко', 'глютен', 'яйца', 'рыба']
+
+    def profile(_):
+        allergies = rnd.choice(allergens) if rnd.random() < 0.1 else None
+        preferences = 'вегетарианец' if rnd.random() < 0.05 else None
+        return {'allergies': allergies, 'preferences': preferences, 'allergen_mask': student_mask(allergies, preferences)}
+    student_ids = _create_users(Student, 'student', 'student', students, student_hash, profile)
+    cook_ids = _create_users(Cook, 'cook', 'cook', cooks, cook_hash)
+    admin_ids = _create_users(Admin, 'admin', 'admin', admins, admin_hash)
+
+    # История по учебным дням
+    meals_taken, payments, feedbacks, orders, items = [], [], [], [], []
+    order_id = _next_id(PurchaseOrder)
+    for offset in range(days, 0, -1):
+        day = end_date - timedelta(days=offset - 1)
+        if day.weekday() >= 5:
+            continue
+        moment = datetime.combine(day, datetime.min.time())
+        for student_id in rnd.sample(student_ids, int(len(student_ids) * participation)):
+            meal_id = rnd.choice(meal_ids)
+            meals_taken.append({'student_id': student_id, 'meal_id': meal_id, 'taken_date': day})
+            if rnd.random() < 0.05:
+                feedbacks.append({'student_id': student_id, 'meal_id': meal_id, 'rating': rnd.randint(1, 5),
+                                  'comment': None, 'created_at': moment + timedelta(hours=13, seconds=rnd.randrange(3600))})
+        for student_id in rnd.sample(student_ids, len(student_ids) // 5):
+            subscription = rnd.random() < 0.3
+            payments.append({'student_id': student_id, 'amount': 2000.0 if subscription else float(rnd.randrange(80, 200, 10)),
+                             'type': 'subscription' if subscription else 'single',
+                             'payment_date': moment + timedelta(hours=8, seconds=rnd.randrange(36000))})
+        status = rnd.choices(['approved', 'rejected', 'pending'], [0.8, 0.1, 0.1])[0] if offset > 3 else 'pending'
+        orders.append({'id': order_id, 'cook_id': rnd.choice(cook_ids), 'status': status,
+                       'approver_id': rnd.choice(admin_ids) if status != 'pending' else None,
+                       'created_at': moment + timedelta(hours=15), 'approved_at': moment + timedelta(days=1) if status != 'pending' else None})
+        for product_id in rnd.sample(product_ids, rnd.randint(3, 6)):
+            quantity = float(rnd.randrange(5, 100))
+            items.append({'order_id': order_id, 'product_id': product_id, 'quantity_requested': quantity,
+                          'quantity_approved': quantity if status == 'approved' else None})
+        order_id += 1
+
+    _insert(MealTaken.__table__, meals_taken)
+    _insert(Payment.__table__, payments)
+    _insert(Feedback.__table__, feedbacks)
+    _insert(PurchaseOrder.__table__, orders)
+    _insert(OrderItem.__table__, items)
+    # История — прошлое, остатки продуктов её уже учитывают: списание по рецептам начинается после неё
+    max_id = db.session.query(db.func.max(MealTaken.id)).scalar() or 0
+    db.session.merge(RollupCursor(source='stock', last_id=max_id))
+    db.session.commit()
+    return {'students': len(student_ids), 'meals': len(meal_ids), 'products': len(product_ids), 'meal_taken': len(meals_taken),
+            'payments': len(payments), 'feedback': len(feedbacks), 'orders': len(orders), 'order_items': len(items)}
@@ -0,0 +1,129 @@
+# exporter.py
+# Потоковая выгрузка для бухгалтерии: оплаты, история питания, заявки с позициями (CSV / JSON Lines)
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from models import User, Meal, MealTaken, Payment, PurchaseOrder, OrderItem, Product
+from archive import with_archive
+from pagination import parse_date
+
+FORMAT_CSV = 'csv'
+FORMAT_JSONL = 'jsonl'
+FORMATS = (FORMAT_CSV, FORMAT_JSONL)
+MIMETYPES = {FORMAT_CSV: 'text/csv', FORMAT_JSONL: 'application/x-ndjson'}
+
+# Строк на одну выборку из курсора и байт в одном куске ответа
+YIELD_PER = 1000
+CHUNK_BYTES = 64 * 1024
+
+
+def _payments():
+    # Период может уходить в архив: оперативная таблица и архив читаются как одна
+    payment = with_archive(Payment)
+    stmt = (
+        select(payment.id, payment.payment_date, payment.student_id, User.username, payment.type, payment.amount)
+        .join(User, User.id == payment.student_id)
+    )
+    return stmt, payment.payment_date, (payment.payment_date, payment.id)
+
+
+def _meals():
+    taken = with_archive(MealTaken)
+    stmt = (
+        select(taken.id, taken.taken_date, taken.student_id, User.username,
+               taken.meal_id, Meal.name.label('meal_name'), Meal.price)
+        .join(User, User.id == taken.student_id)
+        .join(Meal, Meal.id == taken.meal_id)
+    )
+    return stmt, taken.taken_date, (taken.taken_date, taken.id)
+
+
+def _orders():
+    # Одна строка на позицию заявки; поля заявки повторяются
+    cook, approver = aliased(User), aliased(User)
+    stmt = (
+        select(PurchaseOrder.id.label('order_id'), PurchaseOrder.created_at, PurchaseOrder.status,
+               cook.username.label('cook'), approver.username.label('approver'), PurchaseOrder.approved_at,
+               OrderItem.id.label('item_id'), OrderItem.product_id, Product.name.label('product'), Product.unit,
+               OrderItem.quantity_requested, OrderItem.quantity_approved)
+        .join(OrderItem, OrderItem.order_id == PurchaseOrder.id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .join(cook, cook.id == PurchaseOrder.cook_id)
+        .outerjoin(approver, approver.id == PurchaseOrder.approver_id)
+    )
+    return stmt, PurchaseOrder.created_at, (PurchaseOrder.created_at, PurchaseOrder.id, OrderItem.id)
+
+
+DATASETS = {'payments': _payments, 'meals': _meals, 'orders': _orders}
+
+
+def build_query(dataset, date_from=None, date_to=None):
+    """SELECT набора данных за период из строк 'YYYY-MM-DD' (обе границы включительно)."""
+    stmt, column, order = DATASETS[dataset]()
+    start, end = parse_date(date_from), parse_date(date_to)
+    # Колонки Date (taken_date) SQLite хранит как 'YYYY-MM-DD' — сравниваем с датой, а не с datetime
+    is_date = column.type.python_type is date
+    if start:
+        stmt = stmt.where(column >= (start.date() if is_date else start))
+    if end:
+        end += timedelta(days=1)
+        stmt = stmt.where(column < (end.date() if is_date else end))
+    return stmt.order_by(*order)
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _encode(rows, columns, fmt):
+    # Строки копятся в буфере и отдаются кусками по CHUNK_BYTES
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == FORMAT_CSV else None
+    if writer:
+        writer.writerow(columns)
+    for row in rows:
+        if writer:
+            writer.writerow([_value(v) for v in row])
+        else:
+            buffer.write(json.dumps(dict(zip(columns, map(_value, row))), ensure_ascii=False))
+            buffer.write('\n')
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 — формат gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(engine, dataset, fmt=FORMAT_CSV, date_from=None, date_to=None, compress=False):
+    """Генератор байтов выгрузки: память не зависит от объёма данных.
+
+    Читает через отдельное соединение с stream_results/yield_per, а не через
+    сессию запроса, поэтому генератор можно отдавать в потоковый ответ после
+    выхода из view. В режиме WAL длинное чтение не блокирует запись.
+    """
+    stmt = build_query(dataset, date_from, date_to)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=YIELD_PER).execute(stmt)
+        chunks = _encode(result, list(result.keys()), fmt)
+        yield from _gzip(chunks) if compress else chunks
+
+
+def filename(dataset, fmt, date_from=None, date_to=None, compress=False):
+    # В имя попадают только корректные даты — значения из запроса в заголовок не копируем
+    period = '_'.join(d.strftime('%Y-%m-%d') for d in (parse_date(date_from), parse_date(date_to)) if d)
+    name = f'{dataset}_{period}' if period else dataset
+    return f'{name}.{fmt}' + ('.gz' if compress else '')
@@ -0,0 +1,106 @@
+# identity.py
+# Кэш пользователей сессии: load_user без запроса к БД на каждый запрос
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, User, Student
+
+
+class SessionUser(UserMixin):
+    """Снимок пользователя для current_user: роль и поля профиля, нужные кабинетам.
+
+    Не привязан к сессии SQLAlchemy; для изменения данных загружайте ORM-объект.
+    """
+
+    def __init__(self, id, username, role, allergies=None, preferences=None, allergen_mask=0):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.allergies = allergies
+        self.preferences = preferences
+        self.allergen_mask = allergen_mask or 0
+
+    def __repr__(self):
+        return f'<SessionUser {self.username} ({self.role})>'
+
+
+class UserCache:
+    """LRU-кэш снимков пользователей по id с TTL."""
+
+    def __init__(self, ttl=30, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        user = _load_session_user(user_id)
+        if user is not None:
+            with self._lock:
+                self._entries[user_id] = (time.monotonic(), user)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+def _load_session_user(user_id):
+    # Один запрос с LEFT JOIN на student вместо полиморфной загрузки и отдельного Student.query.get
+    student = Student.__table__
+    row = db.session.query(
+        User.id, User.username, User.role, student.c.allergies, student.c.preferences, student.c.allergen_mask
+    ).outerjoin(student, student.c.id == User.id).filter(User.id == user_id).first()
+    return SessionUser(*row) if row else None
+
+
+def get_user_cache():
+    """Кэш пользователей текущего приложения (создаётся при первом обращении)."""
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        cache = UserCache(current_app.config.get('USER_CACHE_TTL', 30), current_app.config.get('USER_CACHE_SIZE', 1024))
+        current_app.extensions['user_cache'] = cache
+    return cache
+
+
+# --- Инвалидация при смене пароля, роли или профиля ---
+
+@event.listens_for(Session, 'after_flush')
+def _collect_user_changes(session, flush_context):
+    ids = session.info.setdefault('user_changes', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            ids.add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    ids = session.info.pop('user_changes', None)
+    if ids and has_app_context():
+        get_user_cache().invalidate(*ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_user_changes(session):
+    session.info.pop('user_changes', None)
@@ -0,0 +1,211 @@
+# importer.py
+# Потоковый импорт CSV: списки учеников и каталог продуктов, пакетами по chunk_size строк
+import csv
+from itertools import islice
+from flask import current_app
+from sqlalchemy import insert, update
+from models import db, User, Student, Product
+from allergens import parse_allergies, refresh_meals_for_products, student_mask
+from catalog import get_catalog, KIND_MENU, KIND_PRODUCTS
+from identity import get_user_cache
+from passwords import hash_many
+
+STUDENT_FIELDS = ('username', 'password', 'allergies', 'preferences')
+PRODUCT_FIELDS = ('name', 'unit', 'current_stock', 'allergens')
+
+
+class ImportResult:
+    """Итог импорта: счётчики и первые preview ошибок (полный отчёт уходит в on_error)."""
+
+    def __init__(self, preview=100):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+        self.preview = preview
+
+    def error(self, line, key, message):
+        self.error_count += 1
+        if len(self.errors) < self.preview:
+            self.errors.append((line, key, message))
+
+    def as_dict(self):
+        return {'rows': self.rows, 'inserted': self.inserted, 'updated': self.updated, 'errors': self.error_count}
+
+
+def _chunks(reader, size):
+    # (номер строки файла, строка) пакетами; в памяти не больше одного пакета
+    numbered = ((reader.line_num, row) for row in reader)
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _clean(value):
+    value = (value or '').strip()
+    return value or None
+
+
+def _run(stream, required, process_chunk, on_error, chunk_size, preview):
+    result = ImportResult(preview)
+
+    def report(line, key, message):
+        result.error(line, key, message)
+        if on_error:
+            on_error(line, key, message)
+
+    reader = csv.DictReader(stream)
+    missing = [name for name in required if name not in (reader.fieldnames or [])]
+    if missing:
+        report(1, '', f'нет колонок: {", ".join(missing)}')
+        return result
+    chunk_size = chunk_size or current_app.config['IMPORT_CHUNK_SIZE']
+    for chunk in _chunks(reader, chunk_size):
+        result.rows += len(chunk)
+        try:
+            inserted, updated = process_chunk(chunk, reader.fieldnames, report)
+            db.session.commit()
+        except Exception as exc:
+            # Пакет — одна транзакция: при ошибке БД откатываем его целиком и отмечаем все строки
+            db.session.rollback()
+            for line, _ in chunk:
+                report(line, '', f'пакет не записан: {exc.__class__.__name__}')
+            continue
+        result.inserted += inserted
+        result.updated += updated
+    return result
+
+
+def _unique(chunk, key_field, report):
+    rows = {}
+    for line, row in chunk:
+        key = _clean(row.get(key_field))
+        if key is None:
+            report(line, '', f'пустое поле {key_field}')
+        elif None in row:
+            report(line, key, 'лишние значения в строке (запятая без кавычек?)')
+        elif key in rows:
+            report(line, key, f'повтор строки {rows[key][0]}')
+        else:
+            rows[key] = (line, row)
+    return rows
+
+
+def import_students(stream, on_error=None, chunk_size=None, hasher=hash_many, preview=100):
+    """Загружает учеников из CSV (username,password[,allergies][,preferences]).
+
+    Новые ученики создаются, у существующих обновляются колонки, которые есть в
+    файле (пароль — только если указан). Маска аллергенов считается сразу — по
+    колонкам профиля из файла и текущему профилю ученика. Пароли пакета хэшируются
+    параллельно через hasher((пароль, роль), ...). Каждый пакет — одна транзакция.
+    Ошибочные строки пропускаются и передаются в on_error(строка, ключ, сообщение).
+    """
+    updated_ids = []
+
+    def process(chunk, fieldnames, report):
+        rows = _unique(chunk, 'username', report)
+        # Профиль нужен, чтобы пересчитать маску, когда в файле только одна из колонок
+        students = Student.__table__
+        existing = {
+            row.username: row
+            for row in db.session.query(User.id, User.username, User.role, students.c.allergies, students.c.preferences)
+            .outerjoin(students, students.c.id == User.id).filter(User.username.in_(list(rows)))
+        }
+        profile = [name for name in ('allergies', 'preferences') if name in fieldnames]
+        new, changed, passwords = [], [], []
+        for username, (line, row) in rows.items():
+            password = row.get('password') or ''
+            if len(username) > 80:
+                report(line, username, 'логин длиннее 80 символов')
+                continue
+            if username in existing:
+                current = existing[username]
+                if current.role != 'student':
+                    report(line, username, f'логин занят пользователем с ролью {current.role}')
+                    continue
+                record = {'id': current.id}
+                record.update({name: _clean(row.get(name)) for name in profile})
+                if profile:
+                    # Маска — по новым значениям из файла и текущим из БД для отсутствующей колонки
+                    record['allergen_mask'] = student_mask(record.get('allergies', current.allergies),
+                                                           record.get('preferences', current.preferences))
+                changed.append(record)
+            elif not password:
+                report(line, username, 'для нового ученика нужен пароль')
+                continue
+            else:
+                record = {'username': username, 'role': 'student'}
+                record.update({name: _clean(row.get(name)) for name in profile})
+                record['allergen_mask'] = student_mask(record.get('allergies'), record.get('preferences'))
+                new.append(record)
+            if password:
+                passwords.append((record, password))
+        for (record, _), password_hash in zip(passwords, hasher([(password, 'student') for _, password in passwords])):
+            record['password_hash'] = password_hash
+        changed = [record for record in changed if len(record) > 1]
+        # Bulk INSERT/UPDATE по первичному ключу: строки в user и student одним executemany на таблицу
+        if new:
+            db.session.execute(insert(Student), new)
+        if changed:
+            db.session.execute(update(Student), changed)
+            updated_ids.extend(record['id'] for record in changed)
+        return len(new), len(changed)
+
+    result = _run(stream, ('username',), process, on_error, chunk_size, preview)
+    # Bulk-операции идут мимо flush: снимки обновлённых учеников сбрасываем сами
+    get_user_cache().invalidate(*updated_ids)
+    return result
+
+
+def import_products(stream, on_error=None, chunk_size=None, preview=100):
+    """Загружает каталог продуктов из CSV (name,unit,current_stock[,allergens]), продукт ищется по названию.
+
+    Новые продукты требуют unit и current_stock, у существующих обновляются
+    непустые поля. allergens — теги через пробел или точку с запятой ('milk; eggs'
+    или 'молоко; яйца'); при их изменении пересчитываются маски блюд с этими
+    продуктами. Каждый пакет — одна транзакция.
+    """
+    menu_changed = []
+
+    def process(chunk, fieldnames, report):
+        rows = _unique(chunk, 'name', report)
+        existing = {row.name: row.id for row in db.session.query(Product.id, Product.name).filter(Product.name.in_(list(rows)))}
+        new, changed = [], []
+        for name, (line, row) in rows.items():
+            unit, stock = _clean(row.get('unit')), _clean(row.get('current_stock'))
+            record = {}
+            if unit is not None:
+                record['unit'] = unit
+            if 'allergens' in fieldnames:
+                record['allergens'] = parse_allergies(row.get('allergens'))
+            if stock is not None:
+                try:
+                    record['current_stock'] = float(stock.replace(',', '.'))
+                except ValueError:
+                    report(line, name, f'остаток не число: {stock}')
+                    continue
+                if record['current_stock'] < 0:
+                    report(line, name, 'отрицательный остаток')
+                    continue
+            if name in existing:
+                if record:
+                    changed.append(dict(record, id=existing[name]))
+            elif 'unit' not in record or 'current_stock' not in record:
+                report(line, name, 'для нового продукта нужны unit и current_stock')
+            else:
+                new.append(dict(record, name=name))
+        if new:
+            db.session.execute(insert(Product), new)
+        if changed:
+            db.session.execute(update(Product), changed)
+            if 'allergens' in fieldnames:
+                menu_changed.append(refresh_meals_for_products([record['id'] for record in changed]))
+        return len(new), len(changed)
+
+    result = _run(stream, ('name',), process, on_error, chunk_size, preview)
+    # Bulk-операции идут мимо flush: кэш каталога сбрасываем сами
+    get_catalog().invalidate(KIND_PRODUCTS, *([KIND_MENU] if any(menu_changed) else []))
+    return result
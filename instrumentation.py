@@ -0,0 +1,156 @@
+# instrumentation.py
+# Метрики производительности: задержки по эндпоинтам, SQL-запросы, рендер шаблонов, медленные запросы
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import current_app, g, has_request_context, request, request_started, request_finished, before_render_template, template_rendered
+from sqlalchemy import event
+from models import db
+from query_budget import query_count
+
+# Границы корзин гистограммы задержек, мс
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def _new_endpoint_stats():
+    return {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+            'queries': 0, 'query_ms': 0.0, 'template_ms': 0.0}
+
+
+class PerfStats:
+    """Накопленные метрики процесса. Обновление — несколько сложений под одной блокировкой."""
+
+    def __init__(self, slow_query_ms=100, slow_query_samples=50, profile_keep=10):
+        self.slow_query_ms = slow_query_ms
+        self.endpoints = {}
+        self.templates = {}
+        self.slow_queries = deque(maxlen=slow_query_samples)
+        self.profiles = deque(maxlen=profile_keep)
+        self._lock = threading.Lock()
+
+    def record_request(self, endpoint, duration_ms, queries, query_ms, template_ms):
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if duration_ms <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, _new_endpoint_stats())
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['buckets'][bucket] += 1
+            stats['queries'] += queries
+            stats['query_ms'] += query_ms
+            stats['template_ms'] += template_ms
+
+    def record_template(self, name, duration_ms):
+        with self._lock:
+            stats = self.templates.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+
+    def record_slow_query(self, statement, duration_ms, endpoint):
+        self.slow_queries.append({'statement': statement[:500], 'ms': round(duration_ms, 2), 'endpoint': endpoint,
+                                  'at': datetime.utcnow().isoformat()})
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {}
+            for name, stats in self.endpoints.items():
+                endpoints[name] = dict(stats, avg_ms=round(stats['total_ms'] / stats['count'], 2),
+                                       buckets=dict(zip([f'<={b}' for b in LATENCY_BUCKETS] + ['inf'], stats['buckets'])))
+            templates = {name: dict(stats, avg_ms=round(stats['total_ms'] / stats['count'], 2)) for name, stats in self.templates.items()}
+        return {'endpoints': endpoints, 'templates': templates, 'slow_queries': list(self.slow_queries),
+                'profiles': list(self.profiles)}
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.templates.clear()
+            self.slow_queries.clear()
+            self.profiles.clear()
+
+
+def get_perf():
+    """Метрики текущего приложения или None, если PERF_ENABLED выключен."""
+    return current_app.extensions.get('perf')
+
+
+# --- Сигналы Flask ---
+
+def _on_request_started(sender, **extra):
+    g.perf_start = time.perf_counter()
+    g.perf_queries_start = query_count()
+    g.perf_query_ms = 0.0
+    g.perf_template_ms = 0.0
+    rate = sender.config['PERF_PROFILE_RATE']
+    if rate and random.random() < rate:
+        g.perf_profiler = cProfile.Profile()
+        g.perf_profiler.enable()
+
+
+def _on_request_finished(sender, response, **extra):
+    start = g.get('perf_start')
+    if start is None:
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    endpoint = request.endpoint or 'unknown'
+    stats = sender.extensions['perf']
+    stats.record_request(endpoint, duration_ms, query_count() - g.perf_queries_start, g.perf_query_ms, g.perf_template_ms)
+    profiler = g.pop('perf_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(25)
+        stats.profiles.append({'endpoint': endpoint, 'ms': round(duration_ms, 2), 'stats': out.getvalue()})
+
+
+def _on_before_render(sender, template, context, **extra):
+    g.setdefault('perf_template_stack', []).append(time.perf_counter())
+
+
+def _on_template_rendered(sender, template, context, **extra):
+    stack = g.get('perf_template_stack')
+    if not stack:
+        return
+    duration_ms = (time.perf_counter() - stack.pop()) * 1000
+    if not stack and 'perf_template_ms' in g:
+        g.perf_template_ms += duration_ms
+    sender.extensions['perf'].record_template(template.name or 'string', duration_ms)
+
+
+def init_instrumentation(app):
+    """Подключает сбор метрик к сигналам Flask и событиям движков SQLAlchemy (если PERF_ENABLED)."""
+    if not app.config['PERF_ENABLED']:
+        return
+    stats = PerfStats(app.config['PERF_SLOW_QUERY_MS'], app.config['PERF_SLOW_QUERY_SAMPLES'], app.config['PERF_PROFILE_KEEP'])
+    app.extensions['perf'] = stats
+
+    request_started.connect(_on_request_started, app)
+    request_finished.connect(_on_request_finished, app)
+    before_render_template.connect(_on_before_render, app)
+    template_rendered.connect(_on_template_rendered, app)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('perf_query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('perf_query_start')
+        if not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000
+        endpoint = None
+        # Число запросов считает query_budget, здесь — только их время
+        if has_request_context() and 'perf_query_ms' in g:
+            g.perf_query_ms += duration_ms
+            endpoint = request.endpoint
+        if duration_ms >= stats.slow_query_ms:
+            stats.record_slow_query(statement, duration_ms, endpoint)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', after_cursor_execute)
@@ -0,0 +1,379 @@
+# jobs.py
+# Фоновые задачи без внешнего брокера: расписание в стиле cron, очередь с повторами в таблице job, пул потоков
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, Job, JobSchedule
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# Имя задачи -> функция; аргументы приходят из Job.args, функция сама коммитит свою работу
+REGISTRY = {}
+
+
+def job(name):
+    """Регистрирует функцию как фоновую задачу с именем name."""
+    def register(fn):
+        REGISTRY[name] = fn
+        return fn
+    return register
+
+
+# --- Расписание в стиле cron ---
+
+def _parse_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        step = 1
+        stepped = '/' in part
+        if stepped:
+            part, step = part.split('/')
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = map(int, part.split('-'))
+        else:
+            # Как в cron: 'N/шаг' — от N до конца диапазона, просто 'N' — одно значение
+            start = int(part)
+            end = high if stepped else start
+        if start < low or end > high or step < 1:
+            raise ValueError(f'значение вне диапазона {low}-{high}: {field}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def parse_cron(expr):
+    """'*/5 * * * *' -> (минуты, часы, дни месяца, месяцы, дни недели, ограничены ли дни)."""
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError(f'в расписании нужно 5 полей: {expr!r}')
+    minutes = _parse_field(fields[0], 0, 59)
+    hours = _parse_field(fields[1], 0, 23)
+    days = _parse_field(fields[2], 1, 31)
+    months = _parse_field(fields[3], 1, 12)
+    weekdays = {d % 7 for d in _parse_field(fields[4], 0, 7)}  # 0 и 7 — воскресенье
+    return minutes, hours, days, months, weekdays, (fields[2] != '*', fields[4] != '*')
+
+
+def next_run(expr, after):
+    """Ближайшее время после after (с точностью до минуты), подходящее под cron-выражение."""
+    minutes, hours, days, months, weekdays, (days_set, weekdays_set) = parse_cron(expr)
+    start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    day = start.date()
+    for _ in range(366 * 5):
+        weekday = (day.weekday() + 1) % 7  # в cron неделя начинается с воскресенья
+        day_ok, weekday_ok = day.day in days, weekday in weekdays
+        # Как в cron: если заданы и день месяца, и день недели, подходит любой из них
+        matches = (day_ok or weekday_ok) if days_set and weekdays_set else (day_ok and weekday_ok)
+        if day.month in months and matches:
+            for hour in sorted(hours):
+                for minute in sorted(minutes):
+                    moment = datetime(day.year, day.month, day.day, hour, minute)
+                    if moment >= start:
+                        return moment
+        day += timedelta(days=1)
+    raise ValueError(f'расписание никогда не срабатывает: {expr!r}')
+
+
+# --- Постановка задач ---
+
+def enqueue_job(name, run_at=None, max_attempts=None, scheduled=False, **kwargs):
+    """Ставит разовую задачу в очередь (в текущей транзакции, коммитит вызывающий) и возвращает её."""
+    if name not in REGISTRY:
+        raise KeyError(f'неизвестная задача: {name}')
+    entry = Job(
+        name=name,
+        args=json.dumps(kwargs, ensure_ascii=False, default=str),
+        scheduled=scheduled,
+        max_attempts=max_attempts or current_app.config['JOBS_MAX_ATTEMPTS'],
+        run_at=run_at or datetime.utcnow(),
+    )
+    db.session.add(entry)
+    runner = get_runner()
+    if runner:
+        runner.wake()
+    return entry
+
+
+def _dump(result):
+    if result is None:
+        return None
+    return json.dumps(result, ensure_ascii=False, default=str)[:2000]
+
+
+class JobRunner:
+    """Планировщик и исполнитель задач одного процесса.
+
+    Поток-планировщик раз в poll_interval секунд (или сразу после enqueue_job)
+    ставит в очередь задачи, чьё время по расписанию пришло, и забирает готовые
+    задачи в пул из workers потоков. Расписание и задачи захватываются условным
+    UPDATE (как курсоры агрегатов), поэтому несколько воркеров WSGI-сервера с общей
+    БД не выполняют одно и то же дважды. Упавшая задача повторяется с
+    удваивающейся задержкой до max_attempts раз.
+    """
+
+    def __init__(self, app, schedule=None, workers=2, poll_interval=5.0, retry_delay=30, stale_after=1800):
+        self.app = app
+        self.schedule = schedule or {}
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.stale_after = stale_after
+        self.worker_id = None
+        self._active = 0
+        self._executor = None
+        self._thread = None
+        self._pid = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        # Поток запускается лениво (первым запросом) и заново после fork воркера WSGI-сервера
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            # Первый запрос процесса: расписание из настроек -> таблица, затем поток
+            sync_schedule(self.schedule)
+            self._pid = os.getpid()
+            self.worker_id = f'{socket.gethostname()}:{self._pid}'
+            self._active = 0
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            self._thread = threading.Thread(target=self._loop, name='job-scheduler', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._executor.shutdown(wait=True)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.tick(self._submit)
+            except Exception:
+                logger.exception('Ошибка планировщика задач')
+            finally:
+                with self.app.app_context():
+                    db.session.remove()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _submit(self, job_id):
+        with self._lock:
+            self._active += 1
+        self._executor.submit(self._run_in_thread, job_id)
+
+    def _run_in_thread(self, job_id):
+        try:
+            with self.app.app_context():
+                self.execute(job_id)
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._wake.set()  # Освободился поток — можно брать следующую задачу
+
+    def tick(self, submit=None):
+        """Один проход: расписание, прерванные задачи, запуск готовых.
+
+        submit=None — выполнить задачи сразу в текущем потоке (для CLI).
+        Возвращает число запущенных задач.
+        """
+        now = datetime.utcnow()
+        self._enqueue_due(now)
+        self._recover_stale(now)
+        free = self.workers - self._active if submit else self.workers
+        if free <= 0:
+            return 0
+        now = datetime.utcnow()  # Включая задачи, только что поставленные по расписанию
+        ready = db.session.scalars(
+            select(Job.id).where(Job.status == STATUS_QUEUED, Job.run_at <= now).order_by(Job.run_at, Job.id).limit(free)
+        ).all()
+        started = 0
+        for job_id in ready:
+            claimed = db.session.execute(
+                update(Job).where(Job.id == job_id, Job.status == STATUS_QUEUED).values(
+                    status=STATUS_RUNNING, started_at=now, attempts=Job.attempts + 1, locked_by=self.worker_id
+                )
+            ).rowcount
+            db.session.commit()
+            if not claimed:
+                continue  # Задачу забрал другой процесс
+            started += 1
+            if submit:
+                submit(job_id)
+            else:
+                self.execute(job_id)
+        return started
+
+    def _enqueue_due(self, now):
+        due = db.session.execute(
+            select(JobSchedule.name, JobSchedule.cron, JobSchedule.next_run_at).where(
+                JobSchedule.enabled.is_(True), JobSchedule.next_run_at <= now
+            )
+        ).all()
+        for name, cron, planned in due:
+            # Сдвигаем срок только если его никто не сдвинул раньше — задача ставится ровно один раз
+            moved = db.session.execute(
+                update(JobSchedule).where(JobSchedule.name == name, JobSchedule.next_run_at == planned).values(
+                    next_run_at=next_run(cron, now)
+                )
+            ).rowcount
+            if moved and name in REGISTRY:
+                enqueue_job(name, scheduled=True)
+            db.session.commit()
+
+    def _recover_stale(self, now):
+        # Задачи процесса, который упал посреди выполнения, возвращаем в очередь (или помечаем неудачными)
+        stale = Job.status == STATUS_RUNNING, Job.started_at < now - timedelta(seconds=self.stale_after)
+        error = 'Прервано: процесс остановился во время выполнения'
+        db.session.execute(update(Job).where(*stale, Job.attempts < Job.max_attempts).values(
+            status=STATUS_QUEUED, run_at=now, last_error=error))
+        db.session.execute(update(Job).where(*stale, Job.attempts >= Job.max_attempts).values(
+            status=STATUS_FAILED, finished_at=now, last_error=error))
+        db.session.commit()
+
+    def execute(self, job_id):
+        """Выполняет захваченную задачу и записывает результат или ошибку с планом повтора."""
+        entry = db.session.get(Job, job_id)
+        fn = REGISTRY.get(entry.name)
+        args = json.loads(entry.args or '{}')
+        db.session.commit()  # Не держим транзакцию чтения, пока задача работает
+        start = time.perf_counter()
+        try:
+            if fn is None:
+                raise LookupError(f'неизвестная задача: {entry.name}')
+            result = fn(**args)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            error = traceback.format_exc()
+            logger.warning('Задача %s #%d упала: %s', entry.name, job_id, error.strip().splitlines()[-1])
+            entry = db.session.get(Job, job_id)
+            entry.last_error = error[-4000:]
+            if entry.attempts < entry.max_attempts:
+                entry.status = STATUS_QUEUED
+                entry.run_at = datetime.utcnow() + timedelta(seconds=self.retry_delay * 2 ** (entry.attempts - 1))
+            else:
+                entry.status = STATUS_FAILED
+                entry.finished_at = datetime.utcnow()
+        else:
+            entry = db.session.get(Job, job_id)
+            entry.status = STATUS_DONE
+            entry.result = _dump(result)
+            entry.finished_at = datetime.utcnow()
+        entry.duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        db.session.commit()
+        return entry.status
+
+
+def sync_schedule(schedule):
+    """Приводит таблицу job_schedule к настройке {имя: cron}: новые добавляет, изменённые пересчитывает."""
+    now = datetime.utcnow()
+    existing = {row.name: row for row in JobSchedule.query.all()}
+    for name, cron in schedule.items():
+        next_run(cron, now)  # Проверяем выражение сразу, а не в потоке планировщика
+        row = existing.pop(name, None)
+        if row is None:
+            db.session.add(JobSchedule(name=name, cron=cron, next_run_at=next_run(cron, now), enabled=True))
+        elif row.cron != cron or not row.enabled:
+            row.cron, row.enabled, row.next_run_at = cron, True, next_run(cron, now)
+    for row in existing.values():
+        row.enabled = False
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # Строки одновременно добавил другой процесс — его версия не хуже
+
+
+def init_jobs(app):
+    """Создаёт планировщик задач, если JOBS_ENABLED; поток стартует с первым запросом."""
+    if not app.config['JOBS_ENABLED']:
+        return
+    runner = JobRunner(
+        app,
+        schedule=app.config['JOBS_SCHEDULE'],
+        workers=app.config['JOBS_WORKERS'],
+        poll_interval=app.config['JOBS_POLL_INTERVAL'],
+        retry_delay=app.config['JOBS_RETRY_DELAY'],
+        stale_after=app.config['JOBS_STALE_AFTER'],
+    )
+    app.extensions['jobs'] = runner
+    for cron in app.config['JOBS_SCHEDULE'].values():
+        parse_cron(cron)  # Ошибка в расписании видна при старте, а не в фоне
+
+    app.before_request(runner.ensure_started)
+
+    atexit.register(runner.stop)
+
+
+def get_runner():
+    """Планировщик текущего приложения или None, если фоновые задачи выключены."""
+    return current_app.extensions.get('jobs')
+
+
+def status(limit=50):
+    """Данные для страницы /admin/jobs: расписание с последним запуском и последние задачи."""
+    last_ids = select(func.max(Job.id)).where(Job.scheduled.is_(True)).group_by(Job.name)
+    last = {row.name: row for row in Job.query.filter(Job.id.in_(last_ids))}
+    schedules = [(row, last.get(row.name)) for row in JobSchedule.query.order_by(JobSchedule.name)]
+    recent = Job.query.order_by(Job.id.desc()).limit(limit).all()
+    counts = dict(db.session.query(Job.status, func.count()).group_by(Job.status).all())
+    return {'schedules': schedules, 'recent': recent, 'counts': counts, 'names': sorted(REGISTRY)}
+
+
+# --- Встроенные задачи ---
+
+@job('catch_up')
+def catch_up_job():
+    from rollups import catch_up
+    return catch_up()
+
+
+@job('apply_consumption')
+def apply_consumption_job():
+    from stock import apply_consumption
+    return {'products': len(apply_consumption())}
+
+
+@job('archive')
+def archive_job(days=None):
+    from archive import archive_old
+    return archive_old(days)
+
+
+@job('cleanup_jobs')
+def cleanup_jobs(days=None):
+    """Удаляет завершённые задачи старше JOBS_RETENTION_DAYS дней."""
+    days = days if days is not None else current_app.config['JOBS_RETENTION_DAYS']
+    horizon = datetime.utcnow() - timedelta(days=days)
+    deleted = db.session.execute(
+        delete(Job).where(Job.status.in_((STATUS_DONE, STATUS_FAILED)), Job.finished_at < horizon)
+    ).rowcount
+    db.session.commit()
+    return {'deleted': deleted}
@@ -1,8 +1,8 @@
 # models.py
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin # Хорошая практика использовать UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from passwords import hash_password, verify_password, needs_rehash
 
 db = SQLAlchemy()
 
@@ -11,22 +11,26 @@ class User(UserMixin, db.Model):
     __tablename__ = 'user' # Явно указываем имя таблицы для родителя
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False) # scrypt-хэш длиннее 120 символов
     role = db.Column(db.String(20), nullable=False) # 'student', 'cook', 'admin'
 
     # Связи определяются здесь, так как они относятся к User.id
     meals_taken = db.relationship('MealTaken', backref='user', lazy=True)
     payments = db.relationship('Payment', backref='user', lazy=True)
     feedbacks = db.relationship('Feedback', backref='user', lazy=True)
-    orders_made = db.relationship('PurchaseOrder', backref='user', lazy=True) # Для повара
+    orders_made = db.relationship('PurchaseOrder', backref='user', lazy=True, foreign_keys="PurchaseOrder.cook_id") # Для повара
     orders_approved = db.relationship('PurchaseOrder', backref='admin_approver', lazy=True, foreign_keys="PurchaseOrder.approver_id") # Для админа
 
 
+    # Метод и стоимость хэша зависят от роли (PASSWORD_HASH_<РОЛЬ>), KDF считается в пуле passwords
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password, self.role)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.id, self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash, self.role)
 
     def __repr__(self):
         return f'<User {self.username} ({self.role})>'
@@ -37,6 +41,7 @@ class Student(User):
     id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True) # FK на user.id
     allergies = db.Column(db.Text) # Текстовое поле для аллергий
     preferences = db.Column(db.Text) # Текстовое поле для предпочтений
+    allergen_mask = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Биты аллергенов из allergies/preferences (см. allergens.py)
     # Связи теперь наследуются от User через user.id, НЕ через student.id
 
 class Cook(User):
@@ -63,6 +68,7 @@ class Meal(db.Model):
     price = db.Column(db.Float, nullable=False)
     meal_type_id = db.Column(db.Integer, db.ForeignKey('meal_type.id'), nullable=False)
     meal_type = db.relationship('MealType', backref='meals')
+    allergen_mask = db.Column(db.Integer, nullable=False, default=0, server_default='0') # OR масок продуктов рецепта, пересчитывается при изменениях
 
 class MealTaken(db.Model):
     __tablename__ = 'meal_taken'
@@ -72,7 +78,11 @@ class MealTaken(db.Model):
     meal_id = db.Column(db.Integer, db.ForeignKey('meal.id'), nullable=False)
     taken_date = db.Column(db.Date, default=datetime.utcnow().date())
     # Чтобы избежать дубликатов, можно добавить уникальный индекс
-    __table_args__ = (db.UniqueConstraint('student_id', 'taken_date', name='_student_meal_uc'),)
+    # Выдачи за день (ServingLedger): уникальный индекс начинается со student_id и по дате не помогает
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'taken_date', name='_student_meal_uc'),
+        db.Index('ix_meal_taken_taken_date', 'taken_date'),
+    )
 
 class Payment(db.Model):
     __tablename__ = 'payment'
@@ -82,6 +92,8 @@ class Payment(db.Model):
     amount = db.Column(db.Float, nullable=False)
     payment_date = db.Column(db.DateTime, default=datetime.utcnow)
     type = db.Column(db.String(20)) # 'single', 'subscription'
+    # Для истории оплат ученика (API) по курсору
+    __table_args__ = (db.Index('ix_payment_student_payment_date', 'student_id', 'payment_date'),)
 
 class Feedback(db.Model):
     __tablename__ = 'feedback'
@@ -92,6 +104,12 @@ class Feedback(db.Model):
     rating = db.Column(db.Integer, nullable=False) # 1-5
     comment = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    meal = db.relationship('Meal')
+    # Индексы под keyset-пагинацию и фильтр по блюду (SQLite сам дописывает rowid в конец индекса)
+    __table_args__ = (
+        db.Index('ix_feedback_created_at', 'created_at'),
+        db.Index('ix_feedback_meal_created_at', 'meal_id', 'created_at'),
+    )
 
 class Product(db.Model):
     __tablename__ = 'product'
@@ -99,6 +117,7 @@ class Product(db.Model):
     name = db.Column(db.String(100), nullable=False)
     unit = db.Column(db.String(20), nullable=False) # 'кг', 'шт', 'л'
     current_stock = db.Column(db.Float, nullable=False)
+    allergens = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Теги аллергенов битами (allergens.ALLERGENS)
 
 class Recipe(db.Model):
     __tablename__ = 'recipe'
@@ -113,10 +132,17 @@ class PurchaseOrder(db.Model):
     # Ссылка на user.id (повар)
     cook_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     # Ссылка на user.id (админ)
-    approver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False) # Может быть NULL до одобрения
+    approver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True) # NULL до одобрения
     status = db.Column(db.String(20), default='pending') # 'pending', 'approved', 'rejected'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     approved_at = db.Column(db.DateTime, nullable=True)
+    # Позиции заявки; повар и админ доступны через backref'ы user и admin_approver
+    items = db.relationship('OrderItem', backref='order', lazy=True)
+    # Индексы под keyset-пагинацию и фильтр по статусу
+    __table_args__ = (
+        db.Index('ix_purchase_order_created_at', 'created_at'),
+        db.Index('ix_purchase_order_status_created_at', 'status', 'created_at'),
+    )
 
 class OrderItem(db.Model):
     __tablename__ = 'order_item'
@@ -124,4 +150,72 @@ class OrderItem(db.Model):
     order_id = db.Column(db.Integer, db.ForeignKey('purchase_order.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     quantity_requested = db.Column(db.Float, nullable=False)
-    quantity_approved = db.Column
\ No newline at end of file
+    quantity_approved = db.Column(db.Float) # NULL до одобрения; при одобрении приходуется на склад
+    product = db.relationship('Product')
+
+# --- Предагрегированная статистика для отчётов ---
+class DailyStat(db.Model):
+    __tablename__ = 'daily_stat'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    dimension = db.Column(db.String(20), nullable=False) # 'total', 'meal', 'meal_type', 'payment_type'
+    key = db.Column(db.String(50), nullable=False, default='') # id блюда/типа или тип оплаты; '' для 'total'
+    served = db.Column(db.Integer, nullable=False, default=0) # Выдано блюд (= уникальных учеников: не больше одного в день)
+    revenue = db.Column(db.Float, nullable=False, default=0.0) # Оплаты; для блюд — стоимость выданного по цене блюда
+    payments_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.UniqueConstraint('day', 'dimension', 'key', name='_daily_stat_uc'),)
+
+class RollupCursor(db.Model):
+    __tablename__ = 'rollup_cursor'
+    source = db.Column(db.String(30), primary_key=True) # 'meal_taken', 'payment', 'feedback', 'stock' (списание по рецептам)
+    last_id = db.Column(db.Integer, nullable=False, default=0) # Последняя уже обработанная строка источника
+
+# --- Фоновые задачи (см. jobs.py) ---
+class Job(db.Model):
+    __tablename__ = 'job'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False) # Имя зарегистрированной задачи
+    args = db.Column(db.Text) # Именованные аргументы в JSON
+    status = db.Column(db.String(20), nullable=False, default='queued') # 'queued', 'running', 'done', 'failed'
+    scheduled = db.Column(db.Boolean, nullable=False, default=False) # Поставлена по расписанию, а не вручную
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow) # Не раньше этого времени (повтор — с задержкой)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Float)
+    locked_by = db.Column(db.String(80)) # Какой процесс выполняет задачу (хост:pid)
+    result = db.Column(db.Text)
+    last_error = db.Column(db.Text)
+    # Выборка готовых к запуску и последних запусков по имени
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+        db.Index('ix_job_name_id', 'name', 'id'),
+    )
+
+class JobSchedule(db.Model):
+    __tablename__ = 'job_schedule'
+    name = db.Column(db.String(50), primary_key=True) # Имя задачи
+    cron = db.Column(db.String(100), nullable=False) # 'минуты часы день месяц день_недели'
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+
+# --- Архив старых строк (см. archive.py) ---
+# Те же колонки, что у оперативных таблиц, но без внешних ключей и уникальных ограничений.
+# Схема archive — отдельный файл SQLite, подключаемый к каждому соединению (database.py)
+ARCHIVE_SCHEMA = 'archive'
+
+def _archive_table(model, *indexes):
+    columns = [db.Column(column.name, column.type, primary_key=column.primary_key) for column in model.__table__.columns]
+    return db.Table(model.__tablename__, *columns, *indexes, schema=ARCHIVE_SCHEMA)
+
+meal_taken_archive = _archive_table(MealTaken, db.Index('ix_archive_meal_taken_student', 'student_id', 'taken_date'))
+payment_archive = _archive_table(Payment, db.Index('ix_archive_payment_student', 'student_id', 'payment_date'))
+feedback_archive = _archive_table(
+    Feedback,
+    db.Index('ix_archive_feedback_created_at', 'created_at'),
+    db.Index('ix_archive_feedback_meal_created_at', 'meal_id', 'created_at'),
+)
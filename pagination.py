@@ -0,0 +1,60 @@
+# pagination.py
+# Keyset-пагинация (по курсору) для длинных списков: заявки, отзывы
+import base64
+from datetime import date, datetime, timedelta
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at, row_id):
+    raw = f'{created_at.isoformat()}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Возвращает (created_at, id) или None, если курсор пустой или испорчен."""
+    if not cursor:
+        return None
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        # Для колонок Date (taken_date) в курсоре лежит дата без времени
+        parse = date.fromisoformat if len(created_at) == 10 else datetime.fromisoformat
+        return parse(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
+
+def filter_by_dates(query, column, date_from=None, date_to=None):
+    """Фильтр по диапазону дат из строк 'YYYY-MM-DD' (обе границы включительно)."""
+    start, end = parse_date(date_from), parse_date(date_to)
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column < end + timedelta(days=1))
+    return query
+
+
+def keyset_page(query, model, cursor=None, limit=50, column=None):
+    """Страница записей, отсортированных от новых к старым по (created_at, id).
+
+    Вместо OFFSET используется условие (created_at, id) < курсор, поэтому
+    стоимость страницы не растёт с глубиной и опирается на индекс по created_at.
+    column — другая колонка времени вместо created_at (например, Payment.payment_date).
+    Возвращает (записи, курсор следующей страницы или None).
+    """
+    column = column if column is not None else model.created_at
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(tuple_(column, model.id) < position)
+    rows = query.order_by(column.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], column.key), rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,158 @@
+# passwords.py
+# Хэширование паролей: метод и стоимость по ролям, ограниченный пул для KDF, быстрая повторная проверка
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Метод werkzeug по умолчанию — для ролей без настройки и вне контекста приложения
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class PasswordHasherBusy(Exception):
+    """Пул хэширования не успел обработать пароль за PASSWORD_HASH_TIMEOUT."""
+
+
+def method_for(role):
+    """Метод хэширования werkzeug для роли из настроек PASSWORD_HASH_<РОЛЬ>."""
+    if not has_app_context():
+        return DEFAULT_METHOD
+    return current_app.config.get(f'PASSWORD_HASH_{(role or "").upper()}', DEFAULT_METHOD)
+
+
+@lru_cache(maxsize=None)
+def _normalized(method):
+    # werkzeug дописывает параметры по умолчанию ('pbkdf2' -> 'pbkdf2:sha256:1000000'),
+    # поэтому сравниваем с префиксом настоящего хэша
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def needs_rehash(password_hash, role):
+    """True, если хэш посчитан не тем методом или не с той стоимостью, что настроены для роли."""
+    return password_hash.split('$', 1)[0] != _normalized(method_for(role))
+
+
+class PasswordHasher:
+    """Хэширование и проверка паролей в ограниченном пуле потоков.
+
+    KDF (pbkdf2, scrypt) в hashlib отпускает GIL, поэтому пул из workers потоков
+    занимает не больше workers ядер: волна входов в начале смены ждёт в очереди
+    пула, а остальные запросы обслуживаются. Успешные проверки запоминаются как
+    HMAC(SECRET_KEY, id|хэш|пароль) на cache_ttl секунд — повторный вход с тем же
+    паролем не запускает KDF, смена пароля меняет хэш и ключ.
+    """
+
+    def __init__(self, secret_key, workers=2, timeout=10.0, cache_ttl=600, cache_size=4096):
+        self.secret_key = secret_key.encode() if isinstance(secret_key, str) else secret_key
+        self.workers = workers
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.fast_hits = 0
+        self._verified = OrderedDict()
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Пул создаётся лениво и заново после fork воркера WSGI-сервера
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            return self._executor
+
+    def _run(self, fn, *args):
+        future = self._pool().submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise PasswordHasherBusy()
+
+    def hash(self, password, role):
+        return self._run(generate_password_hash, password, method_for(role))
+
+    def hash_many(self, items):
+        """Пакет хэшей (пароль, роль) в пуле приложения — для загрузок из админки."""
+        return hash_many(items, executor=self._pool())
+
+    def _key(self, user_id, password_hash, password):
+        message = f'{user_id}|{password_hash}|{password}'.encode()
+        return hmac.new(self.secret_key, message, hashlib.sha256).digest()
+
+    def verify(self, user_id, password_hash, password):
+        key = self._key(user_id, password_hash, password) if self.cache_ttl else None
+        if key is not None:
+            with self._lock:
+                verified_at = self._verified.get(key)
+                if verified_at is not None and time.monotonic() - verified_at < self.cache_ttl:
+                    self._verified.move_to_end(key)
+                    self.fast_hits += 1
+                    return True
+        if not self._run(check_password_hash, password_hash, password):
+            return False
+        if key is not None:
+            with self._lock:
+                self._verified[key] = time.monotonic()
+                self._verified.move_to_end(key)
+                while len(self._verified) > self.cache_size:
+                    self._verified.popitem(last=False)
+        return True
+
+    def stats(self):
+        return {'workers': self.workers, 'fast_hits': self.fast_hits, 'verified_cached': len(self._verified)}
+
+
+def init_passwords(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        app.config['SECRET_KEY'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+        cache_ttl=app.config['PASSWORD_VERIFY_CACHE_TTL'],
+        cache_size=app.config['PASSWORD_VERIFY_CACHE_SIZE'],
+    )
+
+
+def get_hasher():
+    """Пул хэширования текущего приложения или None вне контекста приложения."""
+    return current_app.extensions.get('password_hasher') if has_app_context() else None
+
+
+def hash_password(password, role):
+    hasher = get_hasher()
+    if hasher is None:
+        return generate_password_hash(password, method_for(role))
+    return hasher.hash(password, role)
+
+
+def verify_password(user_id, password_hash, password):
+    hasher = get_hasher()
+    if hasher is None:
+        return check_password_hash(password_hash, password)
+    return hasher.verify(user_id, password_hash, password)
+
+
+def hash_many(items, processes=None, executor=None):
+    """Хэши для пакета (пароль, роль) параллельно на всех ядрах — для массового создания учётных записей.
+
+    Без executor создаются отдельные процессы, а не пул запросов, чтобы скрипты не
+    упирались в его лимит; executor позволяет переиспользовать пул между пакетами.
+    Порядок результатов совпадает с порядком items.
+    """
+    items = list(items)
+    passwords = [password for password, _ in items]
+    methods = [method_for(role) for _, role in items]
+    if executor is not None:
+        return list(executor.map(generate_password_hash, passwords, methods))
+    if len(items) < 2:
+        return [generate_password_hash(password, method) for password, method in zip(passwords, methods)]
+    workers = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(generate_password_hash, passwords, methods, chunksize=max(1, len(items) // (workers * 4))))
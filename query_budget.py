@@ -0,0 +1,48 @@
+# query_budget.py
+# Бюджет SQL-запросов на представление: защита от N+1 в шаблонах
+from functools import wraps
+from flask import current_app, g, has_app_context
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Представление выполнило больше запросов, чем ему разрешено."""
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def query_count():
+    """Число SQL-запросов в текущем контексте приложения — единственный счётчик (его читают и метрики)."""
+    return g.get('query_count', 0)
+
+
+def query_budget(limit):
+    """Ограничивает число SQL-запросов, выполняемых представлением (включая рендер шаблона).
+
+    При QUERY_BUDGET_STRICT = True превышение бросает QueryBudgetExceeded —
+    этот режим включают в тестах, чтобы регрессии падали, а не тормозили.
+    Иначе превышение только пишется в лог.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Пользователь сессии загружается до отсчёта (как после login_required): его запрос
+            # при холодном кэше пользователей — не расход представления
+            current_user._get_current_object()
+            start = query_count()
+            response = view(*args, **kwargs)
+            used = query_count() - start
+            if used > limit:
+                message = f'{view.__name__}: {used} SQL-запросов при бюджете {limit}'
+                if current_app.config.get('QUERY_BUDGET_STRICT'):
+                    raise QueryBudgetExceeded(message)
+                current_app.logger.warning(message)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,149 @@
+# rollups.py
+# Инкрементальные дневные агрегаты для отчётов (таблица daily_stat)
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from models import db, Meal, MealTaken, Payment, Feedback, DailyStat, RollupCursor
+
+DIM_TOTAL = 'total'
+DIM_MEAL = 'meal'
+DIM_MEAL_TYPE = 'meal_type'
+DIM_PAYMENT_TYPE = 'payment_type'
+
+STAT_FIELDS = ('served', 'revenue', 'payments_count', 'rating_sum', 'rating_count')
+
+
+def _to_date(value):
+    # func.date() в SQLite возвращает строку 'YYYY-MM-DD'
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def claim_new_rows(source, model):
+    """Диапазон новых строк (last_id, max_id] или None, если догонять нечего."""
+    cursor = db.session.get(RollupCursor, source)
+    last_id = cursor.last_id if cursor else 0
+    max_id = db.session.query(func.max(model.id)).scalar() or 0
+    return (last_id, max_id) if max_id > last_id else None
+
+
+def advance_cursor(source, old_id, new_id):
+    """Сдвигает курсор, только если его никто не сдвинул раньше нас."""
+    table = RollupCursor.__table__
+    stmt = insert(table).values(source=source, last_id=new_id).on_conflict_do_update(
+        index_elements=['source'], set_={'last_id': new_id}, where=table.c.last_id == old_id
+    )
+    return db.session.execute(stmt).rowcount == 1
+
+
+def catch_up():
+    """Добавляет в daily_stat строки meal_taken, payment и feedback, появившиеся с прошлого запуска.
+
+    Новые строки сворачиваются GROUP BY по дню и приплюсовываются к агрегатам
+    (INSERT ... ON CONFLICT DO UPDATE), курсоры сдвигаются в той же транзакции.
+    Стоимость пропорциональна числу новых строк, а не размеру истории.
+    Возвращает число учтённых строк по каждому источнику.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+    claims = {}
+    meal_info = None
+
+    def meal_keys(meal_id):
+        nonlocal meal_info
+        if meal_info is None:
+            meal_info = {row.id: (row.price, row.meal_type_id) for row in db.session.query(Meal.id, Meal.price, Meal.meal_type_id)}
+        price, meal_type_id = meal_info.get(meal_id, (0.0, None))
+        return price, [(DIM_MEAL, str(meal_id)), (DIM_MEAL_TYPE, str(meal_type_id))]
+
+    claim = claim_new_rows('meal_taken', MealTaken)
+    if claim:
+        claims['meal_taken'] = claim
+        rows = db.session.query(MealTaken.taken_date, MealTaken.meal_id, func.count()).filter(
+            MealTaken.id > claim[0], MealTaken.id <= claim[1]
+        ).group_by(MealTaken.taken_date, MealTaken.meal_id).all()
+        for day, meal_id, count in rows:
+            price, keys = meal_keys(meal_id)
+            deltas[(day, DIM_TOTAL, '')]['served'] += count
+            for dimension, key in keys:
+                deltas[(day, dimension, key)]['served'] += count
+                deltas[(day, dimension, key)]['revenue'] += count * price
+
+    claim = claim_new_rows('payment', Payment)
+    if claim:
+        claims['payment'] = claim
+        day = func.date(Payment.payment_date)
+        rows = db.session.query(day, Payment.type, func.sum(Payment.amount), func.count()).filter(
+            Payment.id > claim[0], Payment.id <= claim[1]
+        ).group_by(day, Payment.type).all()
+        for day_value, payment_type, amount, count in rows:
+            for dimension, key in ((DIM_TOTAL, ''), (DIM_PAYMENT_TYPE, payment_type or '')):
+                deltas[(_to_date(day_value), dimension, key)]['revenue'] += amount or 0.0
+                deltas[(_to_date(day_value), dimension, key)]['payments_count'] += count
+
+    claim = claim_new_rows('feedback', Feedback)
+    if claim:
+        claims['feedback'] = claim
+        day = func.date(Feedback.created_at)
+        rows = db.session.query(day, Feedback.meal_id, func.sum(Feedback.rating), func.count()).filter(
+            Feedback.id > claim[0], Feedback.id <= claim[1]
+        ).group_by(day, Feedback.meal_id).all()
+        for day_value, meal_id, rating_sum, count in rows:
+            _, keys = meal_keys(meal_id)
+            for dimension, key in [(DIM_TOTAL, '')] + keys:
+                deltas[(_to_date(day_value), dimension, key)]['rating_sum'] += rating_sum
+                deltas[(_to_date(day_value), dimension, key)]['rating_count'] += count
+
+    if not claims:
+        return {}
+
+    table = DailyStat.__table__
+    for (day, dimension, key), values in deltas.items():
+        stmt = insert(table).values(day=day, dimension=dimension, key=key, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['day', 'dimension', 'key'],
+            set_={field: table.c[field] + stmt.excluded[field] for field in STAT_FIELDS},
+        )
+        db.session.execute(stmt)
+
+    for source, (old_id, new_id) in claims.items():
+        if not advance_cursor(source, old_id, new_id):
+            # Параллельный запуск уже учёл эти строки — откатываемся, чтобы не задвоить
+            db.session.rollback()
+            return {}
+    db.session.commit()
+    return {source: new_id - old_id for source, (old_id, new_id) in claims.items()}
+
+
+def _empty():
+    return dict.fromkeys(STAT_FIELDS, 0)
+
+
+def _finish(values):
+    values['avg_rating'] = round(values['rating_sum'] / values['rating_count'], 2) if values['rating_count'] else None
+    return values
+
+
+def report(date_from, date_to):
+    """Сводка за период только по daily_stat: итоги, динамика по дням и разбивки.
+
+    Объём чтения зависит от длины периода и числа блюд, но не от размера истории.
+    """
+    totals = _empty()
+    trend = defaultdict(_empty)
+    breakdown = {DIM_MEAL: defaultdict(_empty), DIM_MEAL_TYPE: defaultdict(_empty), DIM_PAYMENT_TYPE: defaultdict(_empty)}
+    stats = DailyStat.query.filter(DailyStat.day >= date_from, DailyStat.day <= date_to).all()
+    for stat in stats:
+        if stat.dimension == DIM_TOTAL:
+            targets = (totals, trend[stat.day])
+        else:
+            targets = (breakdown[stat.dimension][stat.key],)
+        for target in targets:
+            for field in STAT_FIELDS:
+                target[field] += getattr(stat, field)
+    return {
+        'totals': _finish(totals),
+        'trend': [(day, _finish(values)) for day, values in sorted(trend.items())],
+        'by_meal': {key: _finish(values) for key, values in breakdown[DIM_MEAL].items()},
+        'by_meal_type': {key: _finish(values) for key, values in breakdown[DIM_MEAL_TYPE].items()},
+        'by_payment_type': {key: _finish(values) for key, values in breakdown[DIM_PAYMENT_TYPE].items()},
+    }
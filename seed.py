@@ -0,0 +1,147 @@
+# seed.py
+# Создание таблиц и тестовые данные (вне пути обработки запросов)
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from models import db, User, Student, Cook, Admin, Meal, MealType, Product
+from allergens import mask_from_tags, refresh_all
+from passwords import hash_many
+from stock import start_consumption
+
+ROLE_MODELS = {'student': Student, 'cook': Cook, 'admin': Admin}
+
+
+def _add_missing_columns():
+    # create_all не меняет существующие таблицы: новые колонки добавляем через
+    # ALTER TABLE ADD COLUMN (у NOT NULL-колонок для этого есть server_default)
+    inspector = inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name, schema=table.schema):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name, schema=table.schema)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                name = db.engine.dialect.identifier_preparer.format_table(table)
+                db.session.execute(text(f'ALTER TABLE {name} ADD COLUMN {ddl}'))
+                added.append(f'{table.name}.{column.name}')
+    db.session.commit()
+    return added
+
+
+def _rebuild_table(table):
+    # SQLite не умеет ALTER COLUMN: переименовываем старую таблицу, создаём новую по модели
+    # и копируем строки. legacy_alter_table не даёт RENAME переписать внешние ключи других
+    # таблиц (order_item.order_id) на временное имя
+    old = f'_{table.name}_old'
+    columns = ', '.join(f'"{column.name}"' for column in table.columns)
+    connection = db.session.connection()
+    connection.exec_driver_sql('PRAGMA legacy_alter_table=ON')
+    try:
+        connection.exec_driver_sql(f'ALTER TABLE "{table.name}" RENAME TO "{old}"')
+        # Индексы переезжают вместе с таблицей под прежними именами — удаляем, create их пересоздаст
+        indexes = connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (old,)
+        ).scalars().all()
+        for index in indexes:
+            connection.exec_driver_sql(f'DROP INDEX "{index}"')
+        table.create(connection)
+        connection.exec_driver_sql(f'INSERT INTO "{table.name}" ({columns}) SELECT {columns} FROM "{old}"')
+        connection.exec_driver_sql(f'DROP TABLE "{old}"')
+    finally:
+        connection.exec_driver_sql('PRAGMA legacy_alter_table=OFF')
+
+
+def _relax_not_null():
+    # Колонки, ставшие в модели необязательными (purchase_order.approver_id — NULL до
+    # рассмотрения заявки), в старых базах остаются NOT NULL: такие таблицы пересобираем
+    inspector = inspect(db.engine)
+    rebuilt = []
+    for table in db.metadata.sorted_tables:
+        if table.schema is not None or not inspector.has_table(table.name):
+            continue
+        required = {column['name'] for column in inspector.get_columns(table.name) if not column['nullable']}
+        if any(column.nullable and not column.primary_key and column.name in required for column in table.columns):
+            _rebuild_table(table)
+            rebuilt.append(table.name)
+    db.session.commit()
+    return rebuilt
+
+
+def _add_missing_indexes():
+    # create_all создаёт индексы только вместе с новой таблицей: индексы, появившиеся
+    # в моделях позже, создаём для существующих таблиц (checkfirst пропускает готовые)
+    connection = db.session.connection()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    db.session.commit()
+
+
+def init_db():
+    # create_all создаёт только недостающие таблицы (с их индексами); в существующих таблицах
+    # колонки добавляет _add_missing_columns, ограничения NOT NULL снимает _relax_not_null,
+    # индексы создаёт _add_missing_indexes
+    db.create_all()
+    _add_missing_columns()
+    _relax_not_null()
+    _add_missing_indexes()
+    # Списание по рецептам — только для выдач после развёртывания, не для всей истории
+    start_consumption()
+    # Маски аллергенов — производные данные: пересчёт дешёвый и заполняет новые колонки
+    refresh_all()
+
+
+def create_users(accounts, role):
+    """Создаёт пользователей роли role из пар (логин, пароль); пароли нескольких — хэшируются параллельно."""
+    model = ROLE_MODELS[role]
+    hashes = hash_many((password, role) for _, password in accounts)
+    for (username, _), password_hash in zip(accounts, hashes):
+        db.session.add(model(username=username, role=role, password_hash=password_hash))
+    db.session.commit()
+    return len(accounts)
+
+
+def seed_demo_data():
+    """Тестовые типы питания, блюда, продукты и пользователи (если их ещё нет)."""
+    if not MealType.query.first():
+        breakfast = MealType(name='Завтрак')
+        lunch = MealType(name='Обед')
+        db.session.add(breakfast)
+        db.session.add(lunch)
+        db.session.commit()
+
+    if not Meal.query.first():
+        meal1 = Meal(name='Каша овсяная', description='На молоке с маслом', price=80.0, meal_type_id=1)
+        meal2 = Meal(name='Борщ', description='Со сметаной и пампушками', price=90.0, meal_type_id=2)
+        meal3 = Meal(name='Греча с котлеткой', description='Гречневая каша с мясной котлетой', price=100.0, meal_type_id=2)
+        db.session.add(meal1)
+        db.session.add(meal2)
+        db.session.add(meal3)
+        db.session.commit()
+
+    if not Product.query.first():
+        prod1 = Product(name='Молоко', unit='л', current_stock=100.0, allergens=mask_from_tags(['milk']))
+        prod2 = Product(name='Овсянка', unit='кг', current_stock=50.0, allergens=mask_from_tags(['gluten']))
+        prod3 = Product(name='Мясо фарш', unit='кг', current_stock=30.0)
+        prod4 = Product(name='Картофель', unit='кг', current_stock=200.0)
+        db.session.add(prod1)
+        db.session.add(prod2)
+        db.session.add(prod3)
+        db.session.add(prod4)
+        db.session.commit()
+
+    # Создание тестовых пользователей
+    if not User.query.filter_by(username='student1').first():
+        s1 = Student(username='student1', role='student')
+        s1.set_password('password')
+        db.session.add(s1)
+    if not User.query.filter_by(username='cook1').first():
+        c1 = Cook(username='cook1', role='cook')
+        c1.set_password('password')
+        db.session.add(c1)
+    if not User.query.filter_by(username='admin1').first():
+        a1 = Admin(username='admin1', role='admin')
+        a1.set_password('password')
+        db.session.add(a1)
+    db.session.commit()
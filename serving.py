@@ -0,0 +1,218 @@
+# serving.py
+# Отметка выдачи питания на линии раздачи (одиночная и пакетная)
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.dialects.sqlite import insert
+from models import db, Student, Meal, MealType, MealTaken
+from allergens import conflicts
+
+# Статусы результата по каждому ученику
+STATUS_TAKEN = 'taken'
+STATUS_DUPLICATE = 'duplicate'
+STATUS_UNKNOWN_STUDENT = 'unknown_student'
+STATUS_UNKNOWN_MEAL = 'unknown_meal'
+
+
+class ServingLedger:
+    """Журнал выдачи питания за текущий день в памяти процесса.
+
+    Загружается из meal_taken один раз за день (и перечитывается раз в
+    refresh_interval секунд, чтобы видеть отметки других воркеров), при смене
+    даты сбрасывается. Источник истины для дубликатов — журнал вместе с
+    ограничением _student_meal_uc: если журнал говорит «уже получил», так оно и
+    есть; если нет — решает INSERT.
+    """
+
+    def __init__(self, refresh_interval=60):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._date = None
+        self._loaded_at = 0.0
+        self._served = set()
+        self._per_meal = Counter()
+        self._meals = {}  # meal_id -> (название блюда, название типа)
+        self._pending = {}  # student_id -> (meal_id, дата): зарезервировано, но ещё не записано в БД
+
+    def _ensure_loaded(self, today):
+        # Вызывается под self._lock
+        expired = time.monotonic() - self._loaded_at > self.refresh_interval
+        if self._date == today and not expired:
+            return
+        rows = db.session.query(MealTaken.student_id, MealTaken.meal_id).filter(MealTaken.taken_date == today).all()
+        self._served = {row.student_id for row in rows}
+        self._per_meal = Counter(row.meal_id for row in rows)
+        # Отметки из очереди отложенной записи ещё не видны в БД, но уже выданы
+        for student_id, (meal_id, day) in self._pending.items():
+            if day == today and student_id not in self._served:
+                self._served.add(student_id)
+                self._per_meal[meal_id] += 1
+        self._meals = {
+            row.id: (row.name, row.type_name)
+            for row in db.session.query(Meal.id, Meal.name, MealType.name.label('type_name')).join(MealType).all()
+        }
+        self._date = today
+        self._loaded_at = time.monotonic()
+
+    def is_served(self, student_id, today=None):
+        today = today or datetime.utcnow().date()
+        with self._lock:
+            self._ensure_loaded(today)
+            return student_id in self._served
+
+    def add(self, student_id, meal_id=None, today=None):
+        """Учитывает выдачу после успешного коммита.
+
+        meal_id=None — ученик уже получил питание в другом воркере, блюдо неизвестно.
+        """
+        today = today or datetime.utcnow().date()
+        with self._lock:
+            self._ensure_loaded(today)
+            if student_id not in self._served:
+                self._count(student_id, meal_id)
+
+    def reserve(self, student_id, meal_id, today=None):
+        """Атомарно проверяет и занимает отметку до записи в БД (для отложенной записи).
+
+        Возвращает False, если ученик уже получил питание сегодня.
+        """
+        today = today or datetime.utcnow().date()
+        with self._lock:
+            self._ensure_loaded(today)
+            if student_id in self._served:
+                return False
+            self._count(student_id, meal_id)
+            self._pending[student_id] = (meal_id, today)
+            return True
+
+    def confirm(self, student_ids):
+        """Отметки записаны в БД (или отброшены ограничением) — больше не держим их отдельно."""
+        with self._lock:
+            for student_id in student_ids:
+                self._pending.pop(student_id, None)
+
+    def release(self, student_id):
+        """Отменяет резерв, который так и не попал в очередь."""
+        with self._lock:
+            pending = self._pending.pop(student_id, None)
+            if pending and pending[1] == self._date and student_id in self._served:
+                self._served.discard(student_id)
+                self._per_meal[pending[0]] -= 1
+
+    def _count(self, student_id, meal_id):
+        # Вызывается под self._lock
+        self._served.add(student_id)
+        if meal_id is not None:
+            self._per_meal[meal_id] += 1
+            if meal_id not in self._meals:
+                row = db.session.query(Meal.name, MealType.name).join(MealType).filter(Meal.id == meal_id).first()
+                if row:
+                    self._meals[meal_id] = tuple(row)
+
+    def counts(self, today=None):
+        """Сколько выдано сегодня: всего, по блюдам и по типам приёма пищи."""
+        today = today or datetime.utcnow().date()
+        with self._lock:
+            self._ensure_loaded(today)
+            per_meal = {}
+            per_meal_type = Counter()
+            for meal_id, count in self._per_meal.items():
+                if not count:
+                    continue
+                meal_name, type_name = self._meals.get(meal_id, (f'#{meal_id}', '—'))
+                per_meal[meal_name] = count
+                per_meal_type[type_name] += count
+            return {'total': len(self._served), 'per_meal': per_meal, 'per_meal_type': dict(per_meal_type)}
+
+    def reset(self):
+        with self._lock:
+            self._date = None
+
+
+def get_ledger():
+    """Журнал выдачи текущего приложения (создаётся при первом обращении)."""
+    ledger = current_app.extensions.get('serving_ledger')
+    if ledger is None:
+        ledger = ServingLedger(current_app.config.get('SERVING_LEDGER_REFRESH', 60))
+        current_app.extensions['serving_ledger'] = ledger
+    return ledger
+
+
+def resolve_badges(badges):
+    """Превращает отсканированные бейджи (id ученика или логин) в id учеников.
+
+    Возвращает словарь {бейдж: student_id}; нераспознанные бейджи в него не попадают.
+    Все бейджи разрешаются одним запросом.
+    """
+    badges = [str(b).strip() for b in badges if str(b).strip()]
+    ids = {int(b) for b in badges if b.isdigit()}
+    names = {b for b in badges if not b.isdigit()}
+    if not ids and not names:
+        return {}
+    rows = db.session.query(Student.id, Student.username).filter(
+        db.or_(Student.id.in_(ids), Student.username.in_(names))
+    ).all()
+    by_id = {row.id: row.id for row in rows}
+    by_name = {row.username: row.id for row in rows}
+    resolved = {}
+    for badge in badges:
+        student_id = by_id.get(int(badge)) if badge.isdigit() else by_name.get(badge)
+        if student_id is not None:
+            resolved[badge] = student_id
+    return resolved
+
+
+def record_meal_marks(marks, taken_date=None):
+    """Записывает пары (student_id, meal_id) одной транзакцией.
+
+    Повторная выдача за день отсекается журналом выдачи в памяти, а всё, что он
+    пропустил, — уникальным ограничением _student_meal_uc (INSERT ... ON CONFLICT
+    DO NOTHING), без предварительного SELECT.
+    Возвращает список результатов в порядке входных пар; в 'allergens' —
+    аллергены ученика в выданном блюде (выдача не блокируется, повар предупреждается).
+    """
+    marks = [(int(student_id), int(meal_id)) for student_id, meal_id in marks]
+    if taken_date is None:
+        taken_date = datetime.utcnow().date()
+    student_ids = {student_id for student_id, _ in marks}
+    meal_ids = {meal_id for _, meal_id in marks}
+
+    # Два запроса на весь пакет вместо двух на каждого ученика
+    # Маски аллергенов приходят теми же запросами — предупреждение повару без JOIN рецептов
+    students = {}
+    if student_ids:
+        rows = db.session.query(Student.id, Student.username, Student.allergen_mask).filter(Student.id.in_(student_ids))
+        students = {row.id: row for row in rows}
+    known_meals = dict(db.session.query(Meal.id, Meal.allergen_mask).filter(Meal.id.in_(meal_ids)).all()) if meal_ids else {}
+
+    ledger = get_ledger()
+    stmt = insert(MealTaken.__table__).on_conflict_do_nothing(index_elements=['student_id', 'taken_date'])
+    results = []
+    served = []
+    for student_id, meal_id in marks:
+        student = students.get(student_id)
+        result = {'student_id': student_id, 'meal_id': meal_id, 'username': student.username if student else None, 'allergens': []}
+        if student is None:
+            result['status'] = STATUS_UNKNOWN_STUDENT
+        elif meal_id not in known_meals:
+            result['status'] = STATUS_UNKNOWN_MEAL
+        elif ledger.is_served(student_id, taken_date):
+            result['status'] = STATUS_DUPLICATE
+        else:
+            result['allergens'] = conflicts(known_meals[meal_id], student.allergen_mask)
+            inserted = db.session.execute(stmt.values(student_id=student_id, meal_id=meal_id, taken_date=taken_date))
+            if inserted.rowcount:
+                result['status'] = STATUS_TAKEN
+                served.append((student_id, meal_id))
+            else:
+                # Отметку уже сделал другой воркер — журнал об этом не знал
+                result['status'] = STATUS_DUPLICATE
+                served.append((student_id, None))
+        results.append(result)
+    db.session.commit()
+    # Журнал обновляем только после успешного коммита
+    for student_id, meal_id in served:
+        ledger.add(student_id, meal_id, taken_date)
+    return results
@@ -0,0 +1,144 @@
+# stock.py
+# Расход продуктов по рецептам, списание остатков, приход по одобренным заявкам и прогноз закупок
+import math
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import String, bindparam, cast, func, select, update
+from catalog import get_catalog, KIND_PRODUCTS
+from models import db, MealTaken, OrderItem, Product, PurchaseOrder, Recipe, DailyStat, RollupCursor
+from rollups import DIM_MEAL, advance_cursor, claim_new_rows
+
+
+def start_consumption():
+    """Ставит курсор списания на последнюю выдачу, если его ещё нет; возвращает True, если поставил.
+
+    Остатки в базе уже учитывают прошлые выдачи: списывать по рецептам нужно
+    только то, что выдано после включения списания, а не всю историю meal_taken.
+    """
+    if db.session.get(RollupCursor, 'stock') is not None:
+        return False
+    max_id = db.session.query(func.max(MealTaken.id)).scalar() or 0
+    created = advance_cursor('stock', 0, max_id)
+    db.session.commit()
+    return created
+
+
+def apply_consumption():
+    """Списывает со склада продукты, израсходованные на блюда, выданные с прошлого списания.
+
+    Расход считается одним запросом для всех блюд и продуктов сразу:
+    (выдано порций по блюдам) x (рецепт: продукт на порцию) = SUM ... GROUP BY product_id.
+    Затем все остатки обновляются одним пакетным UPDATE (не ниже нуля).
+    Возвращает {product_id: списанное количество}.
+    """
+    if start_consumption():
+        return {}
+    claim = claim_new_rows('stock', MealTaken)
+    if not claim:
+        return {}
+    rows = db.session.query(Recipe.product_id, func.sum(Recipe.quantity_needed)).join(
+        MealTaken, MealTaken.meal_id == Recipe.meal_id
+    ).filter(MealTaken.id > claim[0], MealTaken.id <= claim[1]).group_by(Recipe.product_id).all()
+    consumed = {product_id: quantity for product_id, quantity in rows if quantity}
+
+    if consumed:
+        table = Product.__table__
+        stmt = update(table).where(table.c.id == bindparam('product_id')).values(
+            current_stock=func.max(table.c.current_stock - bindparam('quantity'), 0.0)
+        )
+        db.session.execute(stmt, [{'product_id': pid, 'quantity': qty} for pid, qty in consumed.items()])
+    if not advance_cursor('stock', *claim):
+        # Эти выдачи уже списал параллельный запуск
+        db.session.rollback()
+        return {}
+    db.session.commit()
+    if consumed:
+        # Пакетный UPDATE не проходит через события сессии — сбрасываем кэш продуктов сами
+        get_catalog().invalidate(KIND_PRODUCTS)
+    return consumed
+
+
+# Заявок в одном UPDATE ... IN (...): держимся далеко от лимита переменных SQLite
+ORDER_CHUNK = 500
+
+
+def _claim_orders(order_ids, status, approver_id):
+    # Условный UPDATE: статус меняется только у заявок, которые ещё 'pending'.
+    # Из двух одновременных решений по заявке строку получает только первое
+    order_ids = list(dict.fromkeys(order_ids))
+    now = datetime.utcnow()
+    claimed = []
+    for i in range(0, len(order_ids), ORDER_CHUNK):
+        stmt = update(PurchaseOrder).where(
+            PurchaseOrder.id.in_(order_ids[i:i + ORDER_CHUNK]), PurchaseOrder.status == 'pending'
+        ).values(status=status, approver_id=approver_id, approved_at=now).returning(PurchaseOrder.id)
+        claimed.extend(db.session.scalars(stmt.execution_options(synchronize_session=False)))
+    return claimed
+
+
+def approve_orders(order_ids, approver_id):
+    """Одобряет ожидающие заявки и приходует их позиции на склад; всё в одной транзакции.
+
+    Уже рассмотренные (в том числе параллельно другим админом) заявки пропускаются.
+    Одобренное количество позиции — quantity_approved, если оно задано, иначе
+    запрошенное. Остатки обновляются одним UPDATE на пакет заявок с суммой
+    по продукту, без загрузки позиций в сессию. Возвращает id одобренных заявок.
+    """
+    claimed = _claim_orders(order_ids, 'approved', approver_id)
+    items = OrderItem.__table__
+    products = Product.__table__
+    for i in range(0, len(claimed), ORDER_CHUNK):
+        chunk = claimed[i:i + ORDER_CHUNK]
+        db.session.execute(update(items).where(items.c.order_id.in_(chunk)).values(
+            quantity_approved=func.coalesce(items.c.quantity_approved, items.c.quantity_requested)
+        ))
+        received = select(func.sum(items.c.quantity_approved)).where(
+            items.c.order_id.in_(chunk), items.c.product_id == products.c.id
+        ).scalar_subquery()
+        db.session.execute(update(products).where(
+            products.c.id.in_(select(items.c.product_id).where(items.c.order_id.in_(chunk)))
+        ).values(current_stock=products.c.current_stock + received))
+    db.session.commit()
+    if claimed:
+        # UPDATE мимо ORM: объекты в сессии и кэш продуктов устарели
+        db.session.expire_all()
+        get_catalog().invalidate(KIND_PRODUCTS)
+    return claimed
+
+
+def reject_orders(order_ids, approver_id):
+    """Отклоняет ожидающие заявки; возвращает id отклонённых."""
+    claimed = _claim_orders(order_ids, 'rejected', approver_id)
+    db.session.commit()
+    if claimed:
+        db.session.expire_all()
+    return claimed
+
+
+def forecast(window_days=None, target_days=None):
+    """Прогноз по каждому продукту: средний расход в день, дней до нуля и сколько заказать.
+
+    Средний расход берётся за последние window_days дней из дневных агрегатов
+    daily_stat (выдано порций по блюдам), умноженных на рецепты, — одним запросом,
+    независимо от объёма истории meal_taken. Рекомендуемый заказ покрывает
+    target_days дней расхода сверх текущего остатка. Только чтение: агрегаты
+    догоняет фоновая задача catch_up, поэтому данные отстают не больше чем на её период.
+    """
+    window_days = window_days or current_app.config.get('STOCK_FORECAST_WINDOW', 14)
+    target_days = target_days or current_app.config.get('STOCK_TARGET_DAYS', 7)
+    since = datetime.utcnow().date() - timedelta(days=window_days)
+    rows = db.session.query(Recipe.product_id, func.sum(DailyStat.served * Recipe.quantity_needed)).join(
+        DailyStat, DailyStat.key == cast(Recipe.meal_id, String)
+    ).filter(DailyStat.dimension == DIM_MEAL, DailyStat.day >= since).group_by(Recipe.product_id).all()
+    rates = {product_id: (total or 0.0) / window_days for product_id, total in rows}
+
+    result = {}
+    for product_id, stock in db.session.query(Product.id, Product.current_stock):
+        rate = rates.get(product_id, 0.0)
+        shortage = rate * target_days - stock
+        result[product_id] = {
+            'daily_rate': round(rate, 3),
+            'days_left': round(stock / rate, 1) if rate else None,
+            'suggested': math.ceil(shortage * 10) / 10 if shortage > 0 else 0,
+        }
+    return result
@@ -0,0 +1,26 @@
+# tests/conftest.py
+# Общие фикстуры: приложение на временной БД (файл — как в работе: WAL, архив рядом)
+import pytest
+
+from app import create_app
+from seed import init_db
+
+
+@pytest.fixture
+def config():
+    """Настройки поверх Config; тестовый модуль переопределяет фикстуру, чтобы добавить свои."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, config):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'canteen.db'}", 'JOBS_ENABLED': False, **config})
+    with app.app_context():
+        init_db()
+    return app
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
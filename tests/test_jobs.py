@@ -0,0 +1,116 @@
+# tests/test_jobs.py
+# Расписание в стиле cron и повторы упавших задач
+from datetime import datetime, timedelta
+
+import pytest
+
+from jobs import JobRunner, REGISTRY, STATUS_DONE, STATUS_FAILED, STATUS_QUEUED, _parse_field, enqueue_job, next_run, parse_cron
+from models import db, Job
+
+# Четверг
+THURSDAY = datetime(2026, 1, 1, 10, 6, 30)
+
+
+@pytest.mark.parametrize('field, low, high, expected', [
+    ('*', 0, 5, {0, 1, 2, 3, 4, 5}),
+    ('*/15', 0, 59, {0, 15, 30, 45}),
+    ('5/15', 0, 59, {5, 20, 35, 50}),
+    ('10-20/5', 0, 59, {10, 15, 20}),
+    ('1,3,5-6', 0, 7, {1, 3, 5, 6}),
+    ('7', 0, 59, {7}),
+])
+def test_parse_field(field, low, high, expected):
+    assert _parse_field(field, low, high) == expected
+
+
+@pytest.mark.parametrize('expr', ['* * * *', '60 * * * *', '0 24 * * *', '*/0 * * * *', '0 0 0 * *', '0 0 * 13 *'])
+def test_parse_cron_rejects_invalid(expr):
+    with pytest.raises(ValueError):
+        parse_cron(expr)
+
+
+def test_parse_cron_sunday_is_zero_and_seven():
+    assert parse_cron('0 0 * * 7')[4] == parse_cron('0 0 * * 0')[4] == {0}
+
+
+@pytest.mark.parametrize('expr, expected', [
+    ('*/5 * * * *', datetime(2026, 1, 1, 10, 10)),
+    ('5/15 * * * *', datetime(2026, 1, 1, 10, 20)),
+    ('0 9-17/4 * * *', datetime(2026, 1, 1, 13, 0)),
+    ('30 2 * * *', datetime(2026, 1, 2, 2, 30)),
+    ('0 0 1 * *', datetime(2026, 2, 1, 0, 0)),
+    # Только день недели: ближайшая пятница
+    ('0 0 * * 5', datetime(2026, 1, 2, 0, 0)),
+    # Только день месяца
+    ('0 0 13 * *', datetime(2026, 1, 13, 0, 0)),
+    # Заданы оба: подходит любой из них — пятница раньше 13-го
+    ('0 0 13 * 5', datetime(2026, 1, 2, 0, 0)),
+    ('0 0 3 * 1', datetime(2026, 1, 3, 0, 0)),
+])
+def test_next_run(expr, expected):
+    assert next_run(expr, THURSDAY) == expected
+
+
+def test_next_run_is_strictly_after():
+    assert next_run('6 10 * * *', datetime(2026, 1, 1, 10, 6)) == datetime(2026, 1, 2, 10, 6)
+
+
+def test_next_run_rejects_impossible_date():
+    with pytest.raises(ValueError):
+        next_run('0 0 31 2 *', THURSDAY)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def flaky(fail=0):
+        calls.append(len(calls) + 1)
+        if len(calls) <= fail:
+            raise RuntimeError('boom')
+        return {'call': len(calls)}
+
+    monkeypatch.setitem(REGISTRY, 'flaky', flaky)
+    return calls
+
+
+def _run_due(runner, job_id):
+    # Повтор ставится в будущее: переносим срок на сейчас, чтобы не ждать задержку
+    entry = db.session.get(Job, job_id)
+    entry.run_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert runner.tick() == 1
+    return db.session.get(Job, job_id)
+
+
+def test_execute_retries_with_backoff(app, app_context, calls):
+    runner = JobRunner(app, retry_delay=10)
+    entry = enqueue_job('flaky', max_attempts=3, fail=2)
+    db.session.commit()
+    job_id = entry.id
+
+    for attempt, delay in ((1, 10), (2, 20)):
+        before = datetime.utcnow()
+        entry = _run_due(runner, job_id)
+        assert (entry.status, entry.attempts) == (STATUS_QUEUED, attempt)
+        assert 'RuntimeError: boom' in entry.last_error
+        assert before + timedelta(seconds=delay - 1) <= entry.run_at <= datetime.utcnow() + timedelta(seconds=delay)
+        # До срока повтора задача не запускается
+        assert runner.tick() == 0
+
+    entry = _run_due(runner, job_id)
+    assert (entry.status, entry.attempts, entry.result) == (STATUS_DONE, 3, '{"call": 3}')
+    assert calls == [1, 2, 3]
+
+
+def test_execute_fails_after_max_attempts(app, app_context, calls):
+    runner = JobRunner(app, retry_delay=10)
+    entry = enqueue_job('flaky', max_attempts=2, fail=5)
+    db.session.commit()
+    job_id = entry.id
+    _run_due(runner, job_id)
+    entry = _run_due(runner, job_id)
+    assert (entry.status, entry.attempts) == (STATUS_FAILED, 2)
+    assert entry.finished_at is not None
+    assert runner.tick() == 0
+    assert calls == [1, 2]
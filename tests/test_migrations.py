@@ -0,0 +1,92 @@
+# tests/test_migrations.py
+# init_db на базе со схемой первой версии (instance/canteen.db до изменений): колонки, NOT NULL, индексы
+import sqlite3
+
+import pytest
+from sqlalchemy import inspect
+
+from app import create_app
+from models import db, PurchaseOrder
+from seed import init_db
+
+# Схема первой версии — как её создавал тогдашний db.create_all()
+BASELINE_SCHEMA = '''
+CREATE TABLE user (id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, password_hash VARCHAR(120) NOT NULL,
+    role VARCHAR(20) NOT NULL, PRIMARY KEY (id), UNIQUE (username));
+CREATE TABLE meal_type (id INTEGER NOT NULL, name VARCHAR(50) NOT NULL, PRIMARY KEY (id));
+CREATE TABLE product (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, unit VARCHAR(20) NOT NULL,
+    current_stock FLOAT NOT NULL, PRIMARY KEY (id));
+CREATE TABLE student (id INTEGER NOT NULL, allergies TEXT, preferences TEXT, PRIMARY KEY (id),
+    FOREIGN KEY(id) REFERENCES user (id));
+CREATE TABLE cook (id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(id) REFERENCES user (id));
+CREATE TABLE admin (id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(id) REFERENCES user (id));
+CREATE TABLE meal (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, description TEXT, price FLOAT NOT NULL,
+    meal_type_id INTEGER NOT NULL, PRIMARY KEY (id), FOREIGN KEY(meal_type_id) REFERENCES meal_type (id));
+CREATE TABLE payment (id INTEGER NOT NULL, student_id INTEGER NOT NULL, amount FLOAT NOT NULL,
+    payment_date DATETIME, type VARCHAR(20), PRIMARY KEY (id), FOREIGN KEY(student_id) REFERENCES user (id));
+CREATE TABLE purchase_order (id INTEGER NOT NULL, cook_id INTEGER NOT NULL, approver_id INTEGER NOT NULL,
+    status VARCHAR(20), created_at DATETIME, approved_at DATETIME, PRIMARY KEY (id),
+    FOREIGN KEY(cook_id) REFERENCES user (id), FOREIGN KEY(approver_id) REFERENCES user (id));
+CREATE TABLE meal_taken (id INTEGER NOT NULL, student_id INTEGER NOT NULL, meal_id INTEGER NOT NULL,
+    taken_date DATE, PRIMARY KEY (id), CONSTRAINT _student_meal_uc UNIQUE (student_id, taken_date),
+    FOREIGN KEY(student_id) REFERENCES user (id), FOREIGN KEY(meal_id) REFERENCES meal (id));
+CREATE TABLE feedback (id INTEGER NOT NULL, student_id INTEGER NOT NULL, meal_id INTEGER NOT NULL,
+    rating INTEGER NOT NULL, comment TEXT, created_at DATETIME, PRIMARY KEY (id),
+    FOREIGN KEY(student_id) REFERENCES user (id), FOREIGN KEY(meal_id) REFERENCES meal (id));
+CREATE TABLE recipe (id INTEGER NOT NULL, meal_id INTEGER NOT NULL, product_id INTEGER NOT NULL,
+    quantity_needed FLOAT NOT NULL, PRIMARY KEY (id), FOREIGN KEY(meal_id) REFERENCES meal (id),
+    FOREIGN KEY(product_id) REFERENCES product (id));
+CREATE TABLE order_item (id INTEGER NOT NULL, order_id INTEGER NOT NULL, product_id INTEGER NOT NULL,
+    quantity_requested FLOAT NOT NULL, PRIMARY KEY (id), FOREIGN KEY(order_id) REFERENCES purchase_order (id),
+    FOREIGN KEY(product_id) REFERENCES product (id));
+INSERT INTO user VALUES (1, 'cook', 'x', 'cook'), (2, 'student', 'x', 'student');
+INSERT INTO cook VALUES (1);
+INSERT INTO student VALUES (2, 'рыба', NULL);
+INSERT INTO meal_type VALUES (1, 'Обед');
+INSERT INTO meal VALUES (1, 'Борщ', NULL, 90.0, 1);
+INSERT INTO payment VALUES (1, 2, 90.0, '2025-09-01 10:00:00.000000', 'single');
+INSERT INTO meal_taken VALUES (1, 2, 1, '2025-09-01');
+INSERT INTO feedback VALUES (1, 2, 1, 5, NULL, '2025-09-01 12:00:00.000000');
+'''
+
+# Индексы, добавленные в модели после первой версии
+NEW_INDEXES = {
+    'feedback': {'ix_feedback_created_at', 'ix_feedback_meal_created_at'},
+    'meal_taken': {'ix_meal_taken_taken_date'},
+    'payment': {'ix_payment_student_payment_date'},
+    'purchase_order': {'ix_purchase_order_created_at', 'ix_purchase_order_status_created_at'},
+}
+
+
+@pytest.fixture
+def app(tmp_path):
+    path = tmp_path / 'canteen.db'
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.close()
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'JOBS_ENABLED': False}, web=False)
+    with app.app_context():
+        init_db()
+        yield app
+        db.session.remove()
+
+
+def _indexes(table):
+    return {index['name'] for index in inspect(db.engine).get_indexes(table)}
+
+
+def test_init_db_creates_new_indexes(app):
+    for table, names in NEW_INDEXES.items():
+        assert names <= _indexes(table), table
+
+
+def test_init_db_is_idempotent(app):
+    before = {table: _indexes(table) for table in NEW_INDEXES}
+    init_db()
+    assert {table: _indexes(table) for table in NEW_INDEXES} == before
+
+
+def test_init_db_relaxes_approver_id(app):
+    db.session.add(PurchaseOrder(cook_id=1, status='pending'))
+    db.session.commit()
+    assert PurchaseOrder.query.one().approver_id is None
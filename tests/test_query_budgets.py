@@ -0,0 +1,117 @@
+# tests/test_query_budgets.py
+# Бюджеты запросов (@query_budget) в строгом режиме: превышение — ошибка теста, а не строчка в логе
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Feedback, Meal, MealTaken, MealType, OrderItem, Payment, Product, PurchaseOrder, Recipe, Student, User
+from seed import create_users
+
+PASSWORD = 'password'
+CHEAP_HASH = 'pbkdf2:sha256:1000'
+# id в чистой БД — в порядке создания (см. _seed)
+STUDENT_SERVED, STUDENT_NEW, MEAL = 1, 2, 2
+
+
+@pytest.fixture
+def config():
+    return {
+        'TESTING': True,  # QueryBudgetExceeded долетает до теста, а не превращается в 500
+        'QUERY_BUDGET_STRICT': True,
+        'PAGE_SIZE': 3,  # Несколько страниц заявок и отзывов
+        'PASSWORD_HASH_STUDENT': CHEAP_HASH,
+        'PASSWORD_HASH_COOK': CHEAP_HASH,
+        'PASSWORD_HASH_ADMIN': CHEAP_HASH,
+    }
+
+
+def _seed():
+    for username, role in (('student1', 'student'), ('student2', 'student'), ('cook1', 'cook'), ('admin1', 'admin')):
+        create_users([(username, PASSWORD)], role)
+    db.session.get(Student, STUDENT_SERVED).allergies = 'молоко'
+    breakfast, lunch = MealType(name='Завтрак'), MealType(name='Обед')
+    db.session.add_all([breakfast, lunch])
+    meals = [Meal(name='Каша', price=80, meal_type=breakfast), Meal(name='Борщ', price=90, meal_type=lunch),
+             Meal(name='Рыба с рисом', price=110, meal_type=lunch)]
+    products = [Product(name='Молоко', unit='л', current_stock=50), Product(name='Свёкла', unit='кг', current_stock=20),
+                Product(name='Рыба', unit='кг', current_stock=10)]
+    db.session.add_all(meals + products)
+    db.session.flush()
+    db.session.add_all([Recipe(meal_id=meal.id, product_id=product.id, quantity_needed=0.2)
+                        for meal, product in zip(meals, products)])
+
+    cook, admin = (User.query.filter_by(username=name).one().id for name in ('cook1', 'admin1'))
+    start = datetime.utcnow() - timedelta(days=10)
+    for i, status in enumerate(('pending', 'approved', 'rejected', 'pending', 'approved', 'pending', 'approved')):
+        order = PurchaseOrder(cook_id=cook, status=status, created_at=start + timedelta(days=i),
+                              approver_id=admin if status != 'pending' else None)
+        order.items = [OrderItem(product_id=product.id, quantity_requested=5 + i,
+                                 quantity_approved=5 + i if status == 'approved' else None)
+                       for product in products[:1 + i % 3]]
+        db.session.add(order)
+    for i in range(7):
+        db.session.add(Feedback(student_id=STUDENT_SERVED + i % 2, meal_id=meals[i % 3].id, rating=1 + i % 5,
+                                comment=f'отзыв {i}', created_at=start + timedelta(days=i)))
+        db.session.add(Payment(student_id=STUDENT_SERVED + i % 2, amount=90, type='single',
+                               payment_date=start + timedelta(days=i)))
+    db.session.add(MealTaken(student_id=STUDENT_SERVED, meal_id=meals[0].id, taken_date=datetime.utcnow().date()))
+    db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        _seed()
+    return app.test_client()
+
+
+def _login(client, username):
+    response = client.post('/login', data={'username': username, 'password': PASSWORD})
+    assert response.status_code == 302
+
+
+GET_VIEWS = [
+    (None, '/menu'),
+    ('student1', '/menu'),
+    ('student1', '/student/dashboard'),
+    ('cook1', '/cook/dashboard'),
+    ('cook1', '/cook/track_meals'),
+    ('admin1', '/admin/dashboard'),
+    ('admin1', '/admin/manage_orders'),
+    ('admin1', '/admin/manage_orders?status=pending'),
+    ('admin1', '/admin/manage_orders?status=approved&date_from=2000-01-01'),
+    ('admin1', '/admin/feedback'),
+    ('admin1', f'/admin/feedback?meal_id={MEAL}'),
+]
+
+
+@pytest.mark.parametrize('username, url', GET_VIEWS)
+def test_get_within_budget(client, username, url):
+    if username:
+        _login(client, username)
+    # Первый запрос — при холодных кэшах справочников и пользователей, второй — при тёплых
+    for _ in range(2):
+        assert client.get(url).status_code == 200
+
+
+@pytest.mark.parametrize('url', ['/admin/manage_orders', '/admin/feedback'])
+def test_next_page_within_budget(client, url):
+    _login(client, 'admin1')
+    pages = 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages += 1
+        found = re.search(r'href="([^"]*cursor=[^"]*)"', response.get_data(as_text=True))
+        url = found.group(1).replace('&amp;', '&') if found else None
+    assert pages == 3
+
+
+@pytest.mark.parametrize('student_id', [STUDENT_NEW, STUDENT_SERVED])
+def test_track_meal_post_within_budget(client, student_id):
+    _login(client, 'cook1')
+    response = client.post('/cook/track_meals', data={'student_id': student_id, 'meal_id': MEAL})
+    assert response.status_code == 302
+    with client.application.app_context():
+        assert db.session.query(MealTaken).filter_by(student_id=student_id).count() == 1
@@ -0,0 +1,77 @@
+# tests/test_startup.py
+# Холодный старт: команды canteen (--app cli) загружают только модели и БД, веб-приложение — все маршруты
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from flask import url_for
+
+from app import create_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Сторонние библиотеки, без которых не обходится ни один процесс, — база для сравнения
+BASELINE = 'import flask, flask_login, flask_sqlalchemy, sqlalchemy.orm'
+# Надбавка собственного кода к базе для команды canteen, мс: модели и соединение с БД
+CLI_BUDGET_MS = 250
+# Модули веб-части, которые команде canteen не нужны
+WEB_MODULES = ('identity', 'instrumentation', 'jobs', 'serving', 'write_behind', 'exporter', 'importer',
+               'views', 'views.main', 'views.student', 'views.cook', 'views.admin', 'views.api')
+
+# Запуск flask CLI в этом же процессе, чтобы после команды посмотреть sys.modules
+RUN_CLI = '''
+import sys
+from flask.cli import main
+sys.argv = ['flask', '--app', 'cli', 'canteen', 'init-db']
+try:
+    main()
+except SystemExit as exc:
+    assert not exc.code, exc.code
+print(' '.join(sorted(sys.modules)))
+'''
+
+
+@pytest.fixture
+def env(tmp_path):
+    return dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'startup.db'}", JOBS_ENABLED='0')
+
+
+def _python(code, env):
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+
+
+def _best_ms(code, env, runs=5):
+    # Минимум, а не медиана: шум соседних процессов только добавляет время
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _python(code, env)
+        durations.append(time.perf_counter() - start)
+    return min(durations) * 1000
+
+
+def test_cli_command_skips_web_modules(env):
+    loaded = set(_python(RUN_CLI, env).stdout.split())
+    assert 'models' in loaded
+    assert not loaded & set(WEB_MODULES)
+
+
+def test_cli_startup_budget(env):
+    baseline = _best_ms(BASELINE, env)
+    cli = _best_ms('from app import create_app\ncreate_app(web=False)', env)
+    assert cli - baseline < CLI_BUDGET_MS, f'{cli:.0f} мс против {baseline:.0f} мс у зависимостей'
+
+
+def test_flask_routes_lists_views(env):
+    result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'routes'], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True)
+    for endpoint in ('main.login', 'student.dashboard', 'cook.dashboard', 'admin.dashboard', 'api.'):
+        assert endpoint in result.stdout
+
+
+def test_url_for_in_test_request_context():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'JOBS_ENABLED': False})
+    with app.test_request_context():
+        assert url_for('main.login') == '/login'
@@ -0,0 +1,2 @@
+# views/__init__.py
+# Blueprint'ы по областям: общие страницы, ученик, повар, администратор
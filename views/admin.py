@@ -0,0 +1,228 @@
+# views/admin.py
+# Панель администратора: заявки на закупку, отзывы, отчёты, импорт и выгрузка
+import io
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+from models import db, Feedback, PurchaseOrder, OrderItem
+from archive import with_archive
+from catalog import get_catalog, get_meals
+from exporter import stream_export, filename as export_filename, DATASETS, FORMATS, FORMAT_CSV, MIMETYPES
+from identity import get_user_cache
+from jobs import enqueue_job, status as jobs_status, REGISTRY as JOBS
+from importer import import_students, import_products, STUDENT_FIELDS, PRODUCT_FIELDS
+from instrumentation import get_perf
+from passwords import get_hasher
+from pagination import keyset_page, filter_by_dates, parse_date
+from query_budget import query_budget
+from rollups import catch_up, report as rollup_report
+from stock import approve_orders, reject_orders
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+@bp.route('/dashboard')
+@login_required
+@query_budget(1)
+def dashboard():
+    if current_user.role != 'admin':
+        abort(403)
+    # Повара подгружаем тем же запросом, чтобы шаблон не ходил в БД на каждую заявку
+    pending_orders = PurchaseOrder.query.options(joinedload(PurchaseOrder.user)).filter_by(status='pending').all()
+    return render_template('admin/dashboard.html', user=current_user, pending_orders=pending_orders)
+
+@bp.route('/manage_orders')
+@login_required
+@query_budget(2)
+def manage_orders():
+    if current_user.role != 'admin':
+        abort(403)
+    status = request.args.get('status', '')
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    # Повар и админ — JOIN, позиции с продуктами — один дополнительный SELECT ... IN
+    query = PurchaseOrder.query.options(
+        joinedload(PurchaseOrder.user),
+        joinedload(PurchaseOrder.admin_approver),
+        selectinload(PurchaseOrder.items).joinedload(OrderItem.product),
+    )
+    if status:
+        query = query.filter(PurchaseOrder.status == status)
+    query = filter_by_dates(query, PurchaseOrder.created_at, date_from, date_to)
+    orders, next_cursor = keyset_page(query, PurchaseOrder, request.args.get('cursor'), current_app.config['PAGE_SIZE'])
+    filters = {'status': status, 'date_from': date_from, 'date_to': date_to}
+    return render_template('admin/manage_orders.html', orders=orders, next_cursor=next_cursor, filters=filters)
+
+@bp.route('/feedback')
+@login_required
+@query_budget(2) # Страница отзывов и список блюд для фильтра (при холодном кэше справочников)
+def feedback_list():
+    if current_user.role != 'admin':
+        abort(403)
+    meal_id = request.args.get('meal_id', type=int)
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    # Отзывы за любой период: оперативная таблица и архив одним UNION ALL
+    feedback = with_archive(Feedback)
+    query = db.session.query(feedback).options(joinedload(feedback.user), joinedload(feedback.meal))
+    if meal_id:
+        query = query.filter(feedback.meal_id == meal_id)
+    query = filter_by_dates(query, feedback.created_at, date_from, date_to)
+    feedbacks, next_cursor = keyset_page(query, feedback, request.args.get('cursor'), current_app.config['PAGE_SIZE'])
+    filters = {'meal_id': meal_id or '', 'date_from': date_from, 'date_to': date_to}
+    return render_template('admin/feedback.html', feedbacks=feedbacks, meals=get_meals(), next_cursor=next_cursor, filters=filters)
+
+@bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_data():
+    if current_user.role != 'admin':
+        abort(403)
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        kind = request.form.get('kind')
+        if not upload or not upload.filename or kind not in ('students', 'products'):
+            flash('Выберите тип данных и CSV-файл.', 'error')
+            return redirect(url_for('admin.import_data'))
+        # Загруженный файл лежит во временном файле на диске и читается пакетами
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        preview = current_app.config['IMPORT_ERROR_PREVIEW']
+        try:
+            if kind == 'students':
+                result = import_students(stream, hasher=get_hasher().hash_many, preview=preview)
+            else:
+                result = import_products(stream, preview=preview)
+        except UnicodeDecodeError:
+            flash('Файл должен быть в кодировке UTF-8.', 'error')
+            return redirect(url_for('admin.import_data'))
+    return render_template('admin/import.html', result=result, student_fields=STUDENT_FIELDS, product_fields=PRODUCT_FIELDS)
+
+
+def _decided(order_ids, done, verb):
+    skipped = len(set(order_ids)) - len(done)
+    if done:
+        flash(f'{verb} заявок: {len(done)}.', 'success')
+    if skipped:
+        flash(f'Пропущено {skipped}: статус уже изменён.', 'warning')
+
+
+@bp.route('/approve_order/<int:order_id>', methods=['POST'])
+@login_required
+def approve_order(order_id):
+    if current_user.role != 'admin':
+        abort(403)
+    # Статус меняет условный UPDATE: из двух одновременных нажатий срабатывает одно
+    if approve_orders([order_id], current_user.id):
+        flash(f'Заявка #{order_id} одобрена, продукты оприходованы.', 'success')
+    elif db.session.get(PurchaseOrder, order_id) is None:
+        abort(404)
+    else:
+        flash('Статус заявки уже изменен.', 'warning')
+    return redirect(url_for('admin.manage_orders'))
+
+@bp.route('/reject_order/<int:order_id>', methods=['POST'])
+@login_required
+def reject_order(order_id):
+    if current_user.role != 'admin':
+        abort(403)
+    if reject_orders([order_id], current_user.id):
+        flash(f'Заявка #{order_id} отклонена.', 'info')
+    elif db.session.get(PurchaseOrder, order_id) is None:
+        abort(404)
+    else:
+        flash('Статус заявки уже изменен.', 'warning')
+    return redirect(url_for('admin.manage_orders'))
+
+@bp.route('/orders/bulk', methods=['POST'])
+@login_required
+def bulk_orders():
+    if current_user.role != 'admin':
+        abort(403)
+    action = request.form.get('action')
+    if action not in ('approve', 'reject'):
+        abort(400)
+    if request.form.get('all_pending'):
+        order_ids = db.session.scalars(select(PurchaseOrder.id).filter_by(status='pending')).all()
+    else:
+        order_ids = request.form.getlist('order_id', type=int)
+    if not order_ids:
+        flash('Не выбрано ни одной заявки.', 'warning')
+        return redirect(url_for('admin.manage_orders', status='pending'))
+    # Все выбранные заявки — одна транзакция и по одному UPDATE на пакет
+    if action == 'approve':
+        _decided(order_ids, approve_orders(order_ids, current_user.id), 'Одобрено')
+    else:
+        _decided(order_ids, reject_orders(order_ids, current_user.id), 'Отклонено')
+    return redirect(url_for('admin.manage_orders', status='pending'))
+
+@bp.route('/reports')
+@login_required
+def reports():
+    if current_user.role != 'admin':
+        abort(403)
+    # Отчёт читает только daily_stat. Агрегаты догоняет фоновая задача catch_up; GET пишет
+    # в БД, только если фоновые задачи выключены и догнать агрегаты больше некому
+    if not current_app.config['JOBS_ENABLED']:
+        catch_up()
+    today = datetime.utcnow().date()
+    date_to = parse_date(request.args.get('date_to', ''))
+    date_to = date_to.date() if date_to else today
+    date_from = parse_date(request.args.get('date_from', ''))
+    date_from = date_from.date() if date_from else date_to - timedelta(days=29)
+    stats = rollup_report(date_from, date_to)
+    meal_names = {str(m.id): m.name for m in get_meals()}
+    type_names = {str(m.meal_type.id): m.meal_type.name for m in get_meals()}
+    return render_template('admin/reports.html', stats=stats, date_from=date_from, date_to=date_to,
+                           meal_names=meal_names, type_names=type_names)
+
+@bp.route('/export/<dataset>')
+@login_required
+def export(dataset):
+    if current_user.role != 'admin':
+        abort(403)
+    fmt = request.args.get('format', FORMAT_CSV)
+    if dataset not in DATASETS or fmt not in FORMATS:
+        abort(404)
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    compress = bool(request.args.get('gzip'))
+    # Тело — генератор: строки читаются из курсора и уходят клиенту кусками, без сборки файла в памяти
+    body = stream_export(db.engine, dataset, fmt, date_from, date_to, compress)
+    response = current_app.response_class(body, mimetype='application/gzip' if compress else MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={export_filename(dataset, fmt, date_from, date_to, compress)}'
+    return response
+
+@bp.route('/jobs')
+@login_required
+def jobs():
+    if current_user.role != 'admin':
+        abort(403)
+    return render_template('admin/jobs.html', **jobs_status())
+
+@bp.route('/jobs/run', methods=['POST'])
+@login_required
+def run_job():
+    if current_user.role != 'admin':
+        abort(403)
+    name = request.form.get('name', '')
+    if name not in JOBS:
+        abort(400)
+    entry = enqueue_job(name)
+    db.session.commit()
+    flash(f'Задача {name} поставлена в очередь (#{entry.id}).', 'success')
+    return redirect(url_for('admin.jobs'))
+
+@bp.route('/stats')
+@login_required
+def stats():
+    if current_user.role != 'admin':
+        abort(403)
+    # Метрики процесса: задержки по эндпоинтам, SQL, шаблоны, медленные запросы, профили и кэши
+    perf = get_perf()
+    if request.args.get('reset') and perf:
+        perf.reset()
+    data = perf.snapshot() if perf else {}
+    data['caches'] = {'catalog': get_catalog().stats(), 'users': get_user_cache().stats()}
+    data['passwords'] = get_hasher().stats()
+    return jsonify(data)
@@ -0,0 +1,115 @@
+# views/api.py
+# JSON API: меню, блюда, оплаты и история питания ученика, отметка питания
+import hashlib
+import json
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
+from flask_login import current_user
+from models import db, Payment, MealTaken
+from allergens import conflicts, tags_from_mask
+from archive import with_archive
+from catalog import get_catalog, get_meals, get_menu, KIND_MENU
+from pagination import keyset_page
+from serving import STATUS_DUPLICATE, STATUS_UNKNOWN_MEAL
+from write_behind import mark_meal
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+# Эндпоинты, доступные без входа
+PUBLIC_ENDPOINTS = {'api.meals', 'api.menu'}
+
+
+@bp.before_request
+def require_student():
+    if request.endpoint in PUBLIC_ENDPOINTS:
+        return None
+    if not current_user.is_authenticated:
+        return jsonify(error='unauthorized'), 401
+    if current_user.role != 'student':
+        return jsonify(error='forbidden'), 403
+    return None
+
+
+def _compact(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def _catalog_response(key, kind, build):
+    """Ответ по справочнику с ETag/Last-Modified: тело и валидаторы строятся раз на версию кэша.
+
+    ETag — хэш содержимого, поэтому совпадает во всех воркерах; клиент получает 304,
+    пока справочник не изменился.
+    """
+    def load():
+        body = _compact(build())
+        return body, hashlib.sha1(body).hexdigest(), datetime.utcnow().replace(microsecond=0)
+    body, etag, modified = get_catalog().get(key, kind, load)
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.last_modified = modified
+    response.cache_control.no_cache = True  # Кэшировать можно, но перед использованием — ревалидировать
+    return response.make_conditional(request)
+
+
+def _meal_json(meal):
+    return {'id': meal.id, 'name': meal.name, 'price': meal.price, 'type': meal.meal_type_id, 'allergens': tags_from_mask(meal.allergen_mask)}
+
+
+@bp.route('/meals')
+def meals():
+    return _catalog_response('api_meals', KIND_MENU, lambda: [_meal_json(meal) for meal in get_meals()])
+
+
+@bp.route('/menu')
+def menu():
+    def build():
+        return {
+            type_name: [dict(_meal_json(meal), description=meal.description) for meal in type_meals]
+            for type_name, type_meals in get_menu().items()
+        }
+    return _catalog_response('api_menu', KIND_MENU, build)
+
+
+def _page_response(items, next_cursor):
+    response = current_app.response_class(_compact({'items': items, 'next': next_cursor}), mimetype='application/json')
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def _limit():
+    # От 1 до PAGE_SIZE: ноль и отрицательные значения дали бы пустую страницу без курсора
+    page_size = current_app.config['PAGE_SIZE']
+    return max(1, min(request.args.get('limit', page_size, type=int), page_size))
+
+
+@bp.route('/me/payments')
+def my_payments():
+    # История целиком: оперативная таблица и архив одним UNION ALL
+    payment = with_archive(Payment)
+    query = db.session.query(payment).filter(payment.student_id == current_user.id)
+    payments, next_cursor = keyset_page(query, payment, request.args.get('cursor'), _limit(), column=payment.payment_date)
+    items = [{'id': p.id, 'amount': p.amount, 'type': p.type, 'date': p.payment_date.isoformat()} for p in payments]
+    return _page_response(items, next_cursor)
+
+
+@bp.route('/me/meals')
+def my_meals():
+    taken = with_archive(MealTaken)
+    query = db.session.query(taken).filter(taken.student_id == current_user.id)
+    marks, next_cursor = keyset_page(query, taken, request.args.get('cursor'), _limit(), column=taken.taken_date)
+    items = [{'id': m.id, 'meal_id': m.meal_id, 'date': m.taken_date.isoformat()} for m in marks]
+    return _page_response(items, next_cursor)
+
+
+@bp.route('/me/meals', methods=['POST'])
+def mark_my_meal():
+    data = request.get_json(silent=True) or {}
+    try:
+        meal_id = int(data['meal_id'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify(error='meal_id required'), 400
+    status = mark_meal(current_user.id, meal_id)
+    codes = {STATUS_DUPLICATE: 409, STATUS_UNKNOWN_MEAL: 404}
+    meal = next((m for m in get_meals() if m.id == meal_id), None)
+    allergens = conflicts(meal.allergen_mask, current_user.allergen_mask) if meal else []
+    return jsonify(status=status, meal_id=meal_id, allergens=allergens), codes.get(status, 200)
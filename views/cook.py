@@ -0,0 +1,146 @@
+# views/cook.py
+# Панель повара: выдача питания, остатки, заявки на закупку
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify
+from flask_login import login_required, current_user
+from models import db, User, PurchaseOrder, OrderItem
+from catalog import get_meals, get_products
+from query_budget import query_budget
+from serving import get_ledger, record_meal_marks, resolve_badges, STATUS_TAKEN, STATUS_DUPLICATE
+from stock import forecast as forecast_stock
+
+bp = Blueprint('cook', __name__, url_prefix='/cook')
+
+@bp.route('/dashboard')
+@login_required
+@query_budget(3)
+def dashboard():
+    if current_user.role != 'cook':
+        abort(403)
+    inventory = get_products()
+    # Счётчики выдачи берём из журнала в памяти, без COUNT на каждое обновление
+    served = get_ledger().counts()
+    return render_template('cook/dashboard.html', user=current_user, inventory=inventory, served=served)
+
+@bp.route('/track_meals', methods=['GET', 'POST'])
+@login_required
+@query_budget(5)
+def track_meals():
+    if current_user.role != 'cook':
+        abort(403)
+    if request.method == 'POST':
+        student_id = request.form.get('student_id', type=int)
+        meal_id = int(request.form['meal_id'])
+        if student_id is None:
+             flash('Выберите ученика из списка.', 'error')
+             return redirect(url_for('cook.track_meals'))
+
+        # Дубликат за сегодня отсекает уникальное ограничение, а не отдельный запрос
+        result = record_meal_marks([(student_id, meal_id)])[0]
+        if result['status'] == STATUS_DUPLICATE:
+             flash(f'Студент {result["username"]} уже получил питание сегодня.', 'warning')
+        elif result['status'] == STATUS_TAKEN:
+             flash(f'Получение питания отмечено за студентом {result["username"]}.', 'success')
+             if result['allergens']:
+                 flash(f'Внимание: в блюде есть аллергены ученика {result["username"]}: {", ".join(result["allergens"])}.', 'error')
+        else:
+             flash('Ученик или блюдо не найдены.', 'error')
+        return redirect(url_for('cook.track_meals'))
+    # Учеников не грузим: форма ищет их по префиксу логина через search_students
+    meals = get_meals()
+    return render_template('cook/track_meals.html', meals=meals)
+
+
+@bp.route('/track_meals/bulk', methods=['POST'])
+@login_required
+def track_meals_bulk():
+    if current_user.role != 'cook':
+        abort(403)
+    # Пакетная отметка: JSON {"meal_id": ..., "marks": [{"student_id", "meal_id"}], "badges": [...]}
+    # или форма с отсканированными бейджами (по одному на строку) и общим блюдом
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            abort(400)
+        default_meal_id = data.get('meal_id')
+        raw_marks = data.get('marks', [])
+        badges = data.get('badges', [])
+        if not isinstance(raw_marks, list) or not isinstance(badges, list):
+            abort(400)
+        badges = [str(b) for b in badges]
+    else:
+        default_meal_id = request.form.get('meal_id')
+        raw_marks = []
+        badges = request.form.get('badges', '').split()
+
+    try:
+        marks = [(int(m['student_id']), int(m.get('meal_id', default_meal_id))) for m in raw_marks]
+        if badges:
+            default_meal_id = int(default_meal_id)
+    except (KeyError, TypeError, ValueError):
+        abort(400)
+
+    resolved = resolve_badges(badges)
+    unknown_badges = [b for b in badges if b not in resolved]
+    marks.extend((resolved[b], default_meal_id) for b in badges if b in resolved)
+    results = record_meal_marks(marks) if marks else []
+
+    summary = {
+        'taken': sum(1 for r in results if r['status'] == STATUS_TAKEN),
+        'duplicates': sum(1 for r in results if r['status'] == STATUS_DUPLICATE),
+        'allergen_warnings': sum(1 for r in results if r['allergens']),
+        'unknown_badges': unknown_badges,
+    }
+    if request.is_json:
+        return jsonify(results=results, **summary)
+
+    meals = get_meals()
+    return render_template('cook/track_meals.html', meals=meals, results=results, **summary)
+
+@bp.route('/students/search')
+@login_required
+def search_students():
+    if current_user.role != 'cook':
+        abort(403)
+    prefix = request.args.get('q', '').strip()
+    if not prefix:
+        return jsonify([])
+    # Диапазон вместо LIKE 'q%': LIKE в SQLite регистронезависим и не использует
+    # уникальный индекс по username, а сравнение строк — использует
+    students = db.session.query(User.id, User.username).filter(
+        User.role == 'student',
+        User.username >= prefix,
+        User.username < prefix + '\U0010ffff',
+    ).order_by(User.username).limit(20).all()
+    return jsonify([{'id': s.id, 'username': s.username} for s in students])
+
+@bp.route('/purchase_order', methods=['GET', 'POST'])
+@login_required
+def purchase_order():
+    if current_user.role != 'cook':
+        abort(403)
+    # Остатки списывает фоновая задача apply_consumption: GET страницы ничего не пишет в БД
+    products = get_products()
+    if request.method == 'POST':
+        order_items = []
+        for product in products:
+            quantity = request.form.get(f'quantity_{product.id}', 0)
+            if float(quantity) > 0:
+                order_item = OrderItem(product_id=product.id, quantity_requested=float(quantity))
+                order_items.append(order_item)
+
+        if not order_items:
+             flash('Заявка пуста. Добавьте продукты.', 'warning')
+             return redirect(url_for('cook.purchase_order'))
+
+        # Используем current_user.id для cook_id
+        new_order = PurchaseOrder(cook_id=current_user.id, status='pending')
+        db.session.add(new_order)
+        db.session.flush()
+        for item in order_items:
+            item.order_id = new_order.id
+            db.session.add(item)
+        db.session.commit()
+        flash('Заявка на закупку создана и ожидает рассмотрения.', 'success')
+        return redirect(url_for('cook.dashboard'))
+    # Прогноз расхода и рекомендуемые количества для предзаполнения заявки
+    return render_template('cook/purchase_order.html', products=products, forecast=forecast_stock())
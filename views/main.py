@@ -0,0 +1,98 @@
+# views/main.py
+# Общие страницы: главная, вход, регистрация, меню
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_user, logout_user, login_required, current_user
+from models import db, User, Student
+from allergens import conflicts
+from catalog import get_menu
+from passwords import PasswordHasherBusy
+from query_budget import query_budget
+
+bp = Blueprint('main', __name__)
+
+@bp.route('/')
+def index():
+    if current_user.is_authenticated:
+        # Проверяем роль, а не тип класса, так как current_user всегда User
+        if current_user.role == 'student':
+            return redirect(url_for('student.dashboard'))
+        elif current_user.role == 'cook':
+            return redirect(url_for('cook.dashboard'))
+        elif current_user.role == 'admin':
+            return redirect(url_for('admin.dashboard'))
+    return render_template('base.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+
+        user = User.query.filter_by(username=username).first()
+        try:
+            valid = user is not None and user.check_password(password)
+        except PasswordHasherBusy:
+            flash('Сервер перегружен входами, попробуйте ещё раз через минуту.', 'error')
+            return render_template('login.html'), 503
+        if valid:
+            # Параметры хэша для роли поменялись — пересчитываем, пока пароль известен
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except PasswordHasherBusy:
+                    pass  # Пересчитаем при следующем входе
+            login_user(user)
+            flash(f'Добро пожаловать, {current_user.username}!', 'success')
+            return redirect(url_for('main.index'))
+        else:
+            flash('Неверное имя пользователя или пароль.', 'error')
+
+    return render_template('login.html')
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        confirm_password = request.form['confirm_password']
+
+        if password != confirm_password:
+            flash('Пароли не совпадают!', 'error')
+            return render_template('register.html')
+
+        existing_user = User.query.filter_by(username=username).first()
+        if existing_user:
+            flash('Пользователь с таким именем уже существует.', 'error')
+            return render_template('register.html')
+
+        new_student = Student(username=username, role='student')
+        try:
+            new_student.set_password(password)
+        except PasswordHasherBusy:
+            flash('Сервер перегружен входами, попробуйте ещё раз через минуту.', 'error')
+            return render_template('register.html'), 503
+        db.session.add(new_student)
+        db.session.commit()
+        flash('Регистрация прошла успешно! Теперь вы можете войти.', 'success')
+        return redirect(url_for('main.login'))
+
+    return render_template('register.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Вы вышли из системы.', 'info')
+    return redirect(url_for('main.index'))
+
+@bp.route('/menu')
+@query_budget(1)
+def view_menu():
+    menu = get_menu()
+    breakfasts = menu.get('Завтрак', [])
+    lunches = menu.get('Обед', [])
+    # Ученику помечаем блюда с его аллергенами: маска из снимка сессии, без запросов
+    user_mask = current_user.allergen_mask if current_user.is_authenticated and current_user.role == 'student' else 0
+    warnings = {meal.id: conflicts(meal.allergen_mask, user_mask) for meal in breakfasts + lunches if meal.allergen_mask & user_mask}
+    return render_template('menu.html', breakfasts=breakfasts, lunches=lunches, warnings=warnings)
@@ -0,0 +1,133 @@
+# views/student.py
+# Личный кабинет ученика
+import math
+from datetime import datetime
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from flask_login import login_required, current_user
+from models import db, Student, Payment, Feedback
+from allergens import conflicts, safe_meals
+from catalog import get_meals
+from query_budget import query_budget
+from serving import STATUS_TAKEN, STATUS_DUPLICATE
+from write_behind import enqueue, mark_meal, KIND_PAYMENT, KIND_FEEDBACK
+
+bp = Blueprint('student', __name__, url_prefix='/student')
+
+PAYMENT_TYPES = ('single', 'subscription')
+RATINGS = range(1, 6)
+
+@bp.route('/dashboard')
+@login_required
+@query_budget(1)
+def dashboard():
+    if current_user.role != 'student':
+        abort(403)
+    # Аллергии и предпочтения уже есть в снимке пользователя сессии
+    student_details = current_user
+    # Блюда из кэша справочников; с аллергенами ученика — отдельным списком (побитовая проверка маски)
+    all_meals = get_meals()
+    meals = safe_meals(all_meals, current_user.allergen_mask)
+    unsafe = [(meal, conflicts(meal.allergen_mask, current_user.allergen_mask)) for meal in all_meals if meal not in meals]
+    return render_template('student/dashboard.html', user=current_user, student_details=student_details, meals=meals, unsafe=unsafe)
+
+
+@bp.route('/pay', methods=['GET', 'POST'])
+@login_required
+def pay():
+    if current_user.role != 'student':
+        abort(403)
+    if request.method == 'POST':
+        # Проверяем до записи: с очередью ошибка БД случилась бы уже после ответа "успешно"
+        try:
+            amount = float(request.form.get('amount', ''))
+        except ValueError:
+            amount = None
+        payment_type = request.form.get('type')
+        if amount is None or not math.isfinite(amount) or amount <= 0:
+            flash('Сумма оплаты должна быть положительным числом.', 'error')
+            return redirect(url_for('student.pay'))
+        if payment_type not in PAYMENT_TYPES:
+            flash('Выберите тип оплаты.', 'error')
+            return redirect(url_for('student.pay'))
+
+        # Используем current_user.id, так как он равен id в таблице user
+        record = {'student_id': current_user.id, 'amount': amount, 'type': payment_type, 'payment_date': datetime.utcnow()}
+        # При включённой отложенной записи платёж пишется в фоне пакетом
+        if not enqueue(KIND_PAYMENT, record):
+            db.session.add(Payment(**record))
+            db.session.commit()
+        flash(f'Оплата на сумму {amount} выполнена успешно.', 'success')
+        return redirect(url_for('student.dashboard'))
+    return render_template('student/pay.html')
+
+@bp.route('/preferences', methods=['GET', 'POST'])
+@login_required
+def preferences():
+    if current_user.role != 'student':
+        abort(403)
+    # Получаем конкретный объект Student
+    student_obj = Student.query.get(current_user.id)
+    if not student_obj:
+         flash("Ошибка: Профиль студента не найден.", "error")
+         return redirect(url_for('main.index'))
+
+    if request.method == 'POST':
+        allergies = request.form.get('allergies', '')
+        preferences = request.form.get('preferences', '')
+        # Изменяем данные объекта Student
+        student_obj.allergies = allergies
+        student_obj.preferences = preferences
+        db.session.commit()
+        flash('Пищевые особенности сохранены.', 'success')
+        return redirect(url_for('student.dashboard'))
+    # Передаем объект Student в шаблон
+    return render_template('student/preferences.html', user=current_user, student_obj=student_obj)
+
+@bp.route('/feedback', methods=['GET', 'POST'])
+@login_required
+def feedback():
+    if current_user.role != 'student':
+        abort(403)
+    meals = get_meals()
+    if request.method == 'POST':
+        meal_id = request.form.get('meal_id', type=int)
+        rating = request.form.get('rating', type=int)
+        comment = request.form.get('comment', '')
+        # Блюдо — из кэша справочников, без запроса; в очередь попадают только корректные отзывы
+        if meal_id not in {meal.id for meal in meals}:
+            flash('Такого блюда нет в меню.', 'error')
+            return redirect(url_for('student.feedback'))
+        if rating not in RATINGS:
+            flash('Оценка должна быть от 1 до 5.', 'error')
+            return redirect(url_for('student.feedback'))
+
+        # Используем current_user.id
+        record = {'student_id': current_user.id, 'meal_id': meal_id, 'rating': rating, 'comment': comment, 'created_at': datetime.utcnow()}
+        if not enqueue(KIND_FEEDBACK, record):
+            db.session.add(Feedback(**record))
+            db.session.commit()
+        flash('Отзыв отправлен. Спасибо!', 'success')
+        return redirect(url_for('student.dashboard'))
+    return render_template('student/feedback.html', meals=meals)
+
+@bp.route('/mark_taken', methods=['POST'])
+@login_required
+def mark_taken():
+    if current_user.role != 'student':
+        abort(403)
+    meal_id = int(request.form['meal_id'])
+
+    # Проверка, не отмечал ли студент уже прием пищи сегодня:
+    # журнал выдачи в памяти + уникальное ограничение вместо SELECT
+    status = mark_meal(current_user.id, meal_id)
+    if status == STATUS_DUPLICATE:
+        flash('Вы уже отметили получение питания сегодня.', 'warning')
+    elif status == STATUS_TAKEN:
+        flash('Получение питания отмечено.', 'success')
+        meal = next((m for m in get_meals() if m.id == meal_id), None)
+        allergens = conflicts(meal.allergen_mask, current_user.allergen_mask) if meal else []
+        if allergens:
+            flash(f'Внимание: в блюде есть ваши аллергены: {", ".join(allergens)}. Сообщите повару.', 'error')
+    else:
+        flash('Блюдо не найдено.', 'error')
+    return redirect(url_for('student.dashboard'))
@@ -0,0 +1,193 @@
+# write_behind.py
+# Отложенная запись массовых вставок (оплаты, отзывы, отметки питания) пакетами в фоне
+import atexit
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+from sqlalchemy.dialects.sqlite import insert
+from flask import current_app
+from models import db, Payment, Feedback, MealTaken
+from catalog import get_meals
+from serving import get_ledger, record_meal_marks, STATUS_TAKEN, STATUS_DUPLICATE
+
+logger = logging.getLogger(__name__)
+
+KIND_PAYMENT = 'payment'
+KIND_FEEDBACK = 'feedback'
+KIND_MEAL_TAKEN = 'meal_taken'
+
+_TABLES = {KIND_PAYMENT: Payment.__table__, KIND_FEEDBACK: Feedback.__table__, KIND_MEAL_TAKEN: MealTaken.__table__}
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Ограниченная очередь записей и фоновый поток, который пишет их пакетами.
+
+    Запрос кладёт уже проверенную запись и сразу отвечает; поток собирает до
+    batch_size записей (ждёт не дольше flush_interval) и пишет их одной
+    транзакцией — один fsync на пакет вместо одного на запрос. Если очередь
+    заполнена дольше enqueue_timeout, submit возвращает False, и вызывающий код
+    пишет синхронно: так запросы замедляются вместо неограниченного роста очереди.
+    """
+
+    def __init__(self, app, max_size=10000, batch_size=500, flush_interval=0.05, enqueue_timeout=0.5):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Поток запускается лениво и заново после fork воркера WSGI-сервера
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+
+    def submit(self, kind, record):
+        self._ensure_started()
+        try:
+            self._queue.put((kind, record), timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            return False
+
+    def flush(self):
+        """Ждёт, пока всё поставленное в очередь будет записано."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self):
+        """Дописывает очередь и останавливает поток (вызывается при завершении процесса)."""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def stats(self):
+        return {'queued': self._queue.qsize(), 'written': self.written, 'failed': self.failed}
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            stop = item is _STOP
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                stop = item is _STOP
+            records = [entry for entry in batch if entry is not _STOP]
+            try:
+                if records:
+                    with self.app.app_context():
+                        self._write(records)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, records):
+        by_kind = {}
+        for kind, record in records:
+            by_kind.setdefault(kind, []).append(record)
+        try:
+            self._write_batch(by_kind)
+            self.written += len(records)
+        except Exception:
+            # Пакет целиком не записался — пробуем по одной, чтобы одна плохая запись не теряла остальные
+            db.session.rollback()
+            logger.exception('Пакет из %d записей не записан, повтор по одной', len(records))
+            for kind, record in records:
+                try:
+                    self._write_batch({kind: [record]})
+                    self.written += 1
+                except Exception:
+                    db.session.rollback()
+                    self.failed += 1
+                    logger.exception('Запись %s не сохранена: %r', kind, record)
+                    if kind == KIND_MEAL_TAKEN:
+                        get_ledger().release(record['student_id'])
+        finally:
+            db.session.remove()
+
+    def _write_batch(self, by_kind):
+        marks = by_kind.pop(KIND_MEAL_TAKEN, [])
+        for kind, rows in by_kind.items():
+            db.session.execute(_TABLES[kind].insert(), rows)
+        if marks:
+            # Журнал выдачи уже отсёк дубликаты этого процесса; отметки других воркеров
+            # отсекает уникальное ограничение
+            stmt = insert(_TABLES[KIND_MEAL_TAKEN]).on_conflict_do_nothing(index_elements=['student_id', 'taken_date'])
+            db.session.execute(stmt, marks)
+        db.session.commit()
+        if marks:
+            get_ledger().confirm(mark['student_id'] for mark in marks)
+
+
+def init_write_behind(app):
+    """Создаёт очередь отложенной записи, если WRITE_BEHIND_ENABLED."""
+    if not app.config.get('WRITE_BEHIND_ENABLED'):
+        return
+    writer = WriteBehindQueue(
+        app,
+        max_size=app.config['WRITE_BEHIND_QUEUE_SIZE'],
+        batch_size=app.config['WRITE_BEHIND_BATCH_SIZE'],
+        flush_interval=app.config['WRITE_BEHIND_FLUSH_INTERVAL'],
+        enqueue_timeout=app.config['WRITE_BEHIND_ENQUEUE_TIMEOUT'],
+    )
+    app.extensions['write_behind'] = writer
+    atexit.register(writer.stop)
+
+
+def get_writer():
+    """Очередь отложенной записи текущего приложения или None, если она выключена."""
+    return current_app.extensions.get('write_behind')
+
+
+def enqueue(kind, record):
+    """Ставит запись в очередь; False — очередь выключена или переполнена, пишите синхронно."""
+    writer = get_writer()
+    return bool(writer) and writer.submit(kind, record)
+
+
+def enqueue_meal_mark(student_id, meal_id):
+    """Отметка питания через очередь: дубликат проверяется и резервируется в журнале выдачи.
+
+    Возвращает STATUS_TAKEN / STATUS_DUPLICATE или None, если нужно писать синхронно
+    (очередь выключена или переполнена). Блюдо должно быть проверено вызывающим кодом.
+    """
+    writer = get_writer()
+    if writer is None:
+        return None
+    ledger = get_ledger()
+    today = datetime.utcnow().date()
+    if not ledger.reserve(student_id, meal_id, today):
+        return STATUS_DUPLICATE
+    if writer.submit(KIND_MEAL_TAKEN, {'student_id': student_id, 'meal_id': meal_id, 'taken_date': today}):
+        return STATUS_TAKEN
+    ledger.release(student_id)
+    return None
+
+
+def mark_meal(student_id, meal_id):
+    """Отметка питания ученика: через очередь, если она включена и есть место, иначе сразу в БД.
+
+    Возвращает статус из serving (STATUS_TAKEN, STATUS_DUPLICATE, ...).
+    """
+    status = None
+    if any(meal.id == meal_id for meal in get_meals()):
+        status = enqueue_meal_mark(student_id, meal_id)
+    if status is None:
+        status = record_meal_marks([(student_id, meal_id)])[0]['status']
+    return status
@@ -0,0 +1,9 @@
+# wsgi.py
+# Точка входа для WSGI-сервера с несколькими воркерами, например:
+#   gunicorn -w 4 -b 0.0.0.0:8000 wsgi:app
+# Перед первым запуском создайте таблицы: flask --app cli canteen init-db
+# С gunicorn --preload представления импортируются один раз в мастер-процессе,
+# а воркеры получают их готовыми после fork
+from app import create_app
+
+app = create_app()